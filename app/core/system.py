@@ -1,15 +1,23 @@
 from autoop.core.storage import LocalStorage
 from autoop.core.database import Database
-# from autoop.core.ml.dataset import Dataset  # Unused import
+from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.artifact import Artifact
 from autoop.core.storage import Storage
-from typing import List
+from typing import Dict, List, Tuple, Union
+
+
+INDEXED_METADATA = ["task_type", "target_feature", "model"]
 
 
 class ArtifactRegistry:
     """
     A registry for managing artifacts, including saving, listing,
       retrieving, and deleting artifacts.
+
+    Artifacts are indexed in memory by type, name, tag and the metadata
+    fields in `INDEXED_METADATA`. The indexes are kept up to date by
+    `register` and `delete`, and rebuilt from the database entries
+    whenever the database was reloaded with a different generation.
     """
 
     def __init__(self, database: Database, storage: Storage) -> None:
@@ -21,6 +29,8 @@ class ArtifactRegistry:
         """
         self._database = database
         self._storage = storage
+        self._index = None
+        self._indexed_generation = None
 
     def register(self, artifact: Artifact) -> None:
         """
@@ -38,31 +48,99 @@ class ArtifactRegistry:
             "metadata": artifact.metadata,
             "type": artifact.type,
         }
+        self._ensure_index()
+        previous = self._database.get("artifacts", artifact.id)
+        if previous is not None:
+            self._unindex(artifact.id, previous)
         self._database.set("artifacts", artifact.id, entry)
+        self._add_to_index(artifact.id, entry)
+        self._indexed_generation = self._database.generation
+
+    def register_many(self, artifacts: List[Artifact]) -> None:
+        """
+        Register several artifacts with a single database flush.
+
+        :param artifacts: The artifacts to register.
+        """
+        try:
+            with self._database.transaction():
+                for artifact in artifacts:
+                    self.register(artifact)
+        except BaseException:
+            self._index = None
+            raise
+        self._indexed_generation = self._database.generation
 
-    def list(self, type: str = None) -> List[Artifact]:
+    def find(self, type: str = None, name: str = None,
+             tags: List[str] = None,
+             **metadata: Union[str, int, float, bool]) -> List[str]:
         """
-        List all artifacts, optionally filtered by type.
+        Find the ids of the artifacts matching all given criteria.
+
+        :param type: The type of the artifacts.
+        :param name: The name of the artifacts.
+        :param tags: Tags that the artifacts must all carry.
+        :param metadata: Values of indexed metadata fields, for example
+          `task_type="classification", target_feature="quality"`.
+        :return: The ids of the matching artifacts.
+        :raises ValueError: If a metadata field is not indexed.
+        """
+        for field in metadata:
+            if field not in INDEXED_METADATA:
+                raise ValueError(
+                    f"Metadata field {field} is not indexed. Indexed "
+                    f"fields are: {INDEXED_METADATA}"
+                )
+        self._ensure_index()
+        keys = [("metadata", field, value)
+                for field, value in metadata.items()]
+        if type is not None:
+            keys.append(("type", type))
+        if name is not None:
+            keys.append(("name", name))
+        keys.extend(("tag", tag) for tag in tags or [])
+        if not keys:
+            return [id for id, _ in self._database.list("artifacts")]
+        matches = sorted(
+            (self._index.get(key, set()) for key in keys), key=len
+        )
+        return list(matches[0].intersection(*matches[1:]))
+
+    def list(self, type: str = None,
+             **criteria: Union[str, int, float, bool, List[str]]
+             ) -> List[Artifact]:
+        """
+        List all artifacts, optionally filtered by type or any other
+          criteria accepted by `find`.
+
+        The artifacts are lazy: their data is only read from storage on
+        first access.
 
         :param type: The type of artifacts to list.
+        :param criteria: Additional criteria, see `find`.
         :return: A list of artifacts.
         """
-        entries = self._database.list("artifacts")
-        artifacts = []
-        for id, data in entries:
-            if type is not None and data["type"] != type:
-                continue
-            artifact = Artifact(
-                name=data["name"],
-                version=data["version"],
-                asset_path=data["asset_path"],
-                tags=data["tags"],
-                metadata=data["metadata"],
-                data=self._storage.load(data["asset_path"]),
-                type=data["type"],
-            )
-            artifacts.append(artifact)
-        return artifacts
+        return [
+            self._to_artifact(entry)
+            for entry in self.list_metadata(type, **criteria)
+        ]
+
+    def list_metadata(self, type: str = None,
+                      **criteria: Union[str, int, float, bool, List[str]]
+                      ) -> List[Dict]:
+        """
+        List the database entries of all artifacts, optionally filtered
+          by type or any other criteria accepted by `find`, without
+          touching storage.
+
+        :param type: The type of artifacts to list.
+        :param criteria: Additional criteria, see `find`.
+        :return: A list of entries, each including the artifact id.
+        """
+        return [
+            {"id": id, **self._database.get("artifacts", id)}
+            for id in sorted(self.find(type=type, **criteria))
+        ]
 
     def get(self, artifact_id: str) -> Artifact:
         """
@@ -72,15 +150,7 @@ class ArtifactRegistry:
         :return: The retrieved artifact.
         """
         data = self._database.get("artifacts", artifact_id)
-        return Artifact(
-            name=data["name"],
-            version=data["version"],
-            asset_path=data["asset_path"],
-            tags=data["tags"],
-            metadata=data["metadata"],
-            data=self._storage.load(data["asset_path"]),
-            type=data["type"],
-        )
+        return self._to_artifact(data)
 
     def delete(self, artifact_id: str) -> None:
         """
@@ -89,8 +159,113 @@ class ArtifactRegistry:
         :param artifact_id: The ID of the artifact to delete.
         """
         data = self._database.get("artifacts", artifact_id)
+        self._ensure_index()
         self._storage.delete(data["asset_path"])
         self._database.delete("artifacts", artifact_id)
+        self._unindex(artifact_id, data)
+        self._indexed_generation = self._database.generation
+
+    def _to_artifact(self, data: Dict) -> Artifact:
+        """
+        Build a lazy artifact from its database entry.
+
+        Dataset entries become `Dataset` objects so that they are read
+        according to their recorded encoding, straight from a
+        memory-mapped view of their file. Digests computed for datasets
+        registered without one are written back to their entry.
+
+        :param data: The database entry of the artifact.
+        :return: An artifact whose data is loaded on first access.
+        """
+        asset_path = data["asset_path"]
+        fields = {
+            "name": data["name"],
+            "version": data["version"],
+            "asset_path": asset_path,
+            "tags": data["tags"],
+            "metadata": data["metadata"],
+            "loader": lambda: self._storage.load(asset_path),
+        }
+        if data["type"] == "dataset":
+            fields["loader"] = lambda: self._storage.load_view(asset_path)
+            artifact_id = f"{data['name']}_{data['version']}"
+            return Dataset(on_digest=lambda value: self._record_digest(
+                artifact_id, asset_path, value), **fields)
+        return Artifact(type=data["type"], **fields)
+
+    def _record_digest(self, artifact_id: str, asset_path: str,
+                       value: str) -> None:
+        """
+        Persist the content digest of a dataset registered without one.
+
+        Nothing is written if the entry has since been deleted or
+        re-registered with other data.
+
+        :param artifact_id: The id of the dataset.
+        :param asset_path: The asset path the digest was computed from.
+        :param value: The hexadecimal digest of the data.
+        """
+        entry = self._database.get("artifacts", artifact_id)
+        if entry is None or entry["asset_path"] != asset_path or (
+                entry["metadata"].get("digest") not in (None, value)):
+            return
+        self._ensure_index()
+        metadata = {**entry["metadata"], "digest": value}
+        self._database.set("artifacts", artifact_id,
+                           {**entry, "metadata": metadata})
+        self._indexed_generation = self._database.generation
+
+    def _ensure_index(self) -> None:
+        """
+        Rebuild the indexes if the database changed underneath them.
+        """
+        generation = self._database.generation
+        if self._index is not None and self._indexed_generation == generation:
+            return
+        self._index = {}
+        for id, entry in self._database.list("artifacts"):
+            self._add_to_index(id, entry)
+        self._indexed_generation = generation
+
+    def _index_keys(self, entry: Dict) -> List[Tuple]:
+        """
+        Compute the index keys of a database entry.
+
+        :param entry: The database entry of an artifact.
+        :return: The keys under which the entry is indexed.
+        """
+        keys = [("type", entry["type"]), ("name", entry["name"])]
+        keys.extend(("tag", tag) for tag in entry["tags"])
+        for field in INDEXED_METADATA:
+            value = entry["metadata"].get(field)
+            if isinstance(value, (str, int, float, bool)):
+                keys.append(("metadata", field, value))
+        return keys
+
+    def _add_to_index(self, id: str, entry: Dict) -> None:
+        """
+        Add an entry to the indexes.
+
+        :param id: The id of the artifact.
+        :param entry: The database entry of the artifact.
+        """
+        for key in self._index_keys(entry):
+            self._index.setdefault(key, set()).add(id)
+
+    def _unindex(self, id: str, entry: Dict) -> None:
+        """
+        Remove an entry from the indexes.
+
+        :param id: The id of the artifact.
+        :param entry: The database entry of the artifact.
+        """
+        for key in self._index_keys(entry):
+            ids = self._index.get(key)
+            if ids is None:
+                continue
+            ids.discard(id)
+            if not ids:
+                del self._index[key]
 
 
 class AutoMLSystem:
@@ -116,14 +291,17 @@ class AutoMLSystem:
         """
         Get the singleton instance of the AutoMLSystem.
 
+        The database is only reloaded when its storage changed since the
+        previous call.
+
         :return: The singleton instance of AutoMLSystem.
         """
         if AutoMLSystem._instance is None:
             AutoMLSystem._instance = AutoMLSystem(
                 LocalStorage("./assets/objects"),
-                Database(LocalStorage("./assets/dbo"))
+                Database(LocalStorage("./assets/dbo"), journal=True)
             )
-        AutoMLSystem._instance._database.refresh()
+        AutoMLSystem._instance._database.refresh_if_changed()
         return AutoMLSystem._instance
 
     @property
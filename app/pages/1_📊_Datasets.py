@@ -1,23 +1,22 @@
 import streamlit as st
-import pandas as pd
 
 from app.core.system import AutoMLSystem
+from autoop.core.ml.cache import read_csv_cached
 from autoop.core.ml.dataset import Dataset
 
 automl = AutoMLSystem.get_instance()
-datasets = automl.registry.list(type="dataset")
 
 st.title("Dataset Management")
 
 
 def get_datasets() -> list:
     """
-    Retrieve the list of datasets from the registry.
+    Retrieve the database entries of the datasets in the registry.
 
-    :return: List of datasets
+    :return: List of dataset entries
     :rtype: list
     """
-    return automl.registry.list(type="dataset")
+    return automl.registry.list_metadata(type="dataset")
 
 
 datasets = get_datasets()
@@ -25,21 +24,21 @@ datasets = get_datasets()
 st.subheader("Available Datasets")
 if datasets:
     for dataset in datasets:
-        st.write(f"Name: {dataset.name}, Type: {dataset.type}")
+        st.write(f"Name: {dataset['name']}, Type: {dataset['type']}")
 else:
     st.write("No datasets available.")
 
 st.subheader("Upload new Dataset")
 uploaded_file = st.file_uploader("Choose a CSV file to upload", type=["csv"])
 if uploaded_file:
-    data = pd.read_csv(uploaded_file).dropna()
+    data = read_csv_cached(uploaded_file.getvalue()).dropna()
     st.write("### Preview of the uploaded dataset:")
     st.write(data.head())
 
     dataset_name = st.text_input("Enter a name for the dataset")
 
     if dataset_name:
-        asset_path = f"dataset/{dataset_name}.csv"
+        asset_path = f"dataset/{dataset_name}.parquet"
 
         new_dataset = Dataset.from_dataframe(
             data=data,
@@ -7,6 +7,7 @@ from autoop.core.ml.model import get_model
 from autoop.core.ml.metric import METRICS, get_metric
 from autoop.functional.feature import detect_feature_types
 from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.parallel import get_cpu_budget
 
 st.set_page_config(page_title="Modelling", page_icon="📈")
 
@@ -111,6 +112,26 @@ if datasets:
             else:
                 st.write("No models available.")
 
+            hyperparameters = {}
+            if selected_model in ["random_forest", "KNN"]:
+                st.subheader("Parallelism")
+                write_helper_text(
+                    """Choose how many CPU cores the model may use.
+                    Cores are shared with other running pipelines, so
+                    fewer may be granted while they are busy."""
+                )
+                max_workers = get_cpu_budget().total
+                hyperparameters["n_jobs"] = st.number_input(
+                    "Threads" if selected_model == "random_forest"
+                    else "Workers",
+                    min_value=1, max_value=max_workers, value=1
+                )
+                if selected_model == "random_forest":
+                    hyperparameters["n_processes"] = st.number_input(
+                        "Processes (used instead of threads when above 1)",
+                        min_value=1, max_value=max_workers, value=1
+                    )
+
             st.subheader("Select Dataset Split")
             write_helper_text(
                 "Choose a split ratio for training and testing data."
@@ -122,6 +143,16 @@ if datasets:
                 value=0.5,
                 step=0.1,
             )
+            seed = None
+            if st.checkbox("Shuffle rows before splitting"):
+                seed = int(st.number_input(
+                    "Shuffle seed", min_value=0, value=0, step=1))
+            dtype = st.selectbox(
+                "Compute precision", ["float64", "float32"])
+            write_helper_text(
+                """float32 halves the memory of the data and speeds up
+                training, at a small cost in precision."""
+            )
 
             st.subheader("Select Metrics")
             metrics = st.multiselect(
@@ -141,12 +172,15 @@ if datasets:
             - Input Features: {', '.join(input_features)}
             - Target Feature: {target_feature}
             - Model: {selected_model}
+            - Hyperparameters: {hyperparameters}
             - Split Ratio: {split_ratio}
+            - Shuffle Seed: {seed}
+            - Compute Precision: {dtype}
             - Metrics: {', '.join(metrics)}
             """
             )
             # this is where it stops working and i dont know why
-            model = get_model(selected_model)
+            model = get_model(selected_model, **hyperparameters)
             metrics = [get_metric(metric) for metric in metrics]
             input = [
                 feature for feature in features if
@@ -162,7 +196,9 @@ if datasets:
                 dataset=selected_dataset,
                 input_features=input,
                 target_feature=target,
-                split=split_ratio
+                split=split_ratio,
+                seed=seed,
+                dtype=dtype
             )
 
             if st.button("Train Model"):
@@ -211,18 +247,7 @@ if datasets:
                         pipeline._preprocess_features()
                         pipeline._split_data()
                         pipeline._train()
-                        pipeline_data = {
-                            "model": pipeline._model,
-                            "input_features": [feature.name
-                                               for feature in
-                                               pipeline._input_features],
-                            "target_feature":
-                                pipeline._target_feature.name,
-                            "split": pipeline._split,
-                            "artifacts": pipeline._artifacts,
-                            "metrics": pipeline._metrics,
-                        }
-                        serialized_pipeline = pickle.dumps(pipeline_data)
+                        serialized_pipeline = pickle.dumps(pipeline)
 
                         new_pipeline_artifact = Artifact(
                             name=pipeline_name,
@@ -242,6 +267,8 @@ if datasets:
                                 pipeline._target_feature.type == "numerical"
                                     else "classification",
                                 "split_ratio": pipeline._split,
+                                "seed": pipeline._seed,
+                                "dtype": pipeline._dtype,
                                 "metrics": [
                                     metric.__class__.__name__ for
                                     metric in pipeline._metrics
@@ -1,8 +1,9 @@
 import streamlit as st
-import pandas as pd
 import pickle
 import os
 from app.core.system import AutoMLSystem
+from autoop.core.ml.cache import read_csv_cached
+from autoop.core.ml.pipeline import Pipeline
 
 automl = AutoMLSystem.get_instance()
 
@@ -22,6 +23,38 @@ def write_helper_text(text: str) -> None:
 pipeline_dir = "./assets/objects/pipelines"
 
 
+def feature_name(feature: object) -> str:
+    """
+    Get the name of a feature saved either as a Feature or as its name.
+
+    :param feature: The saved feature.
+    :return: The name of the feature.
+    """
+    return getattr(feature, "name", feature)
+
+
+def describe_pipeline(saved: object) -> dict:
+    """
+    Describe a saved pipeline in the format of older pipeline pickles.
+
+    Pipelines used to be saved as a dictionary of their parts; they are
+    now saved as fitted Pipeline objects.
+
+    :param saved: The unpickled pipeline.
+    :return: A dictionary with "model", "input_features",
+        "target_feature", "split" and "metrics" keys.
+    """
+    if isinstance(saved, Pipeline):
+        return {
+            "model": saved.model,
+            "input_features": saved._input_features,
+            "target_feature": saved._target_feature,
+            "split": saved._split,
+            "metrics": saved._metrics,
+        }
+    return saved
+
+
 def get_saved_pipelines():
     """
     Load all saved pipelines from the pipeline directory.
@@ -68,7 +101,7 @@ if pipeline_names:
                 'name'] == selected_pipeline_name
         )
 
-        pipeline_data = selected_pipeline['data']
+        pipeline_data = describe_pipeline(selected_pipeline['data'])
 
         st.subheader("Pipeline Summary")
         write_helper_text("Summary of the selected pipeline.")
@@ -76,9 +109,12 @@ if pipeline_names:
         st.write(f"**Model Type**: {pipeline_data['model'].type}")
         st.write(
             f"**Input Features**: "
-            f"{[feature.name for feature in pipeline_data['input_features']]}"
+            f"{[feature_name(f) for f in pipeline_data['input_features']]}"
+        )
+        st.write(
+            f"**Target Feature**:"
+            f"{feature_name(pipeline_data['target_feature'])}"
         )
-        st.write(f"**Target Feature**:{pipeline_data['target_feature'].name}")
         st.write(f"**Split Ratio**: {pipeline_data['split']}")
         st.write(
             f"{[m.__class__.__name__ for m in pipeline_data['metrics']]}"
@@ -97,18 +133,23 @@ if pipeline_names:
         uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
 
         if uploaded_file:
-            data = pd.read_csv(uploaded_file)
+            data = read_csv_cached(uploaded_file.getvalue()).copy()
             st.write("Uploaded Data Preview:")
             st.dataframe(data.head())
 
             required_columns = [
-                feature.name for feature in pipeline_data['input_features']]
+                feature_name(feature)
+                for feature in pipeline_data['input_features']]
             if all(col in data.columns for col in required_columns):
                 st.write("CSV file has the required columns for predictions.")
 
                 if st.button("Perform Prediction"):
-                    predictions = pipeline_data['model'].predict(
-                        data[required_columns])
+                    if isinstance(selected_pipeline['data'], Pipeline):
+                        predictions = selected_pipeline['data'].predict(
+                            data)
+                    else:
+                        predictions = pipeline_data['model'].predict(
+                            data[required_columns])
 
                     st.success("Predictions completed successfully!")
                     st.write("Predicted Results:")
@@ -1,23 +1,50 @@
 import json
-from typing import Tuple, List, Union
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Tuple, List, Union
 import os
 
-from autoop.core.storage import Storage
+from autoop.core.storage import Storage, NotFoundError
+
+_META_COLLECTION = "_meta"
+_JOURNAL_KEY = f"{_META_COLLECTION}{os.sep}journal"
+_GENERATION_KEY = f"{_META_COLLECTION}{os.sep}generation"
 
 
 class Database():
     """
     A simple database class that uses a storage backend to persist data.
+
+    Only the entries touched by a mutation are written back to storage.
+    In journal mode every mutation appends a single record to an
+    append-only journal instead, and once the journal holds
+    `compaction_threshold` records it is folded back into the per-entry
+    snapshot files.
+
+    Every flush also writes a fresh generation token, which lets other
+    instances over the same storage skip reloading when nothing changed.
     """
 
-    def __init__(self, storage: Storage) -> None:
+    def __init__(self, storage: Storage, journal: bool = False,
+                 compaction_threshold: int = 1000) -> None:
         """
         Initialize the database with a storage backend.
 
         Args:
             storage (Storage): The storage backend to use.
+            journal (bool): Whether to persist mutations through an
+              append-only journal. Defaults to False.
+            compaction_threshold (int): Number of journal records after
+              which the journal is compacted into snapshots.
         """
         self._storage = storage
+        self._journal = journal
+        self._compaction_threshold = compaction_threshold
+        self._dirty = set()
+        self._pending = []
+        self._journal_size = 0
+        self._transaction_depth = 0
+        self._generation = None
         self._data = {}
         self._load()
 
@@ -39,7 +66,7 @@ class Database():
         if not self._data.get(collection, None):
             self._data[collection] = {}
         self._data[collection][id] = entry
-        self._persist()
+        self._record("set", collection, id, entry)
         return entry
 
     def get(self, collection: str, id: str) -> Union[dict, None]:
@@ -70,7 +97,7 @@ class Database():
             return
         if self._data[collection].get(id, None):
             del self._data[collection][id]
-        self._persist()
+        self._record("delete", collection, id)
 
     def list(self, collection: str) -> List[Tuple[str, dict]]:
         """
@@ -94,32 +121,198 @@ class Database():
         """
         self._load()
 
+    @property
+    def generation(self) -> Union[str, None]:
+        """
+        The token of the last state loaded from or written to storage.
+
+        Returns:
+            Union[str, None]: The generation token, or None if the
+              storage has never been written with one.
+        """
+        return self._generation
+
+    def refresh_if_changed(self) -> bool:
+        """
+        Reload the data only if storage was written since the last load.
+
+        Returns:
+            bool: True if the database was reloaded.
+        """
+        if self._read_generation() == self._generation:
+            return False
+        self._load()
+        return True
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """
+        Buffer all mutations made inside the block and flush them once.
+
+        Transactions may be nested; only the outermost block flushes. If
+        the outermost block raises, the buffered mutations are discarded
+        by reloading the database from storage.
+
+        Yields:
+            Database: This database.
+        """
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._load()
+            raise
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            self._flush()
+
+    def compact(self) -> None:
+        """
+        Fold the journal into the snapshot files and truncate it.
+
+        Only the entries touched since the last compaction are rewritten.
+        """
+        self._flush_journal()
+        self._persist()
+        self._storage.save(b"", _JOURNAL_KEY)
+        self._journal_size = 0
+
+    def _record(self, op: str, collection: str, id: str,
+                entry: dict = None) -> None:
+        """
+        Mark an entry as dirty and flush unless a transaction is open.
+
+        Args:
+            op (str): The operation, either "set" or "delete".
+            collection (str): The collection that was mutated.
+            id (str): The id of the mutated entry.
+            entry (dict): The stored data for a "set" operation.
+        """
+        self._dirty.add((collection, id))
+        if self._journal:
+            record = {"op": op, "collection": collection, "id": id}
+            if op == "set":
+                record["entry"] = entry
+            self._pending.append(record)
+        if self._transaction_depth == 0:
+            self._flush()
+
+    def _flush(self) -> None:
+        """
+        Write the buffered mutations to storage.
+        """
+        if not self._journal:
+            self._persist()
+        else:
+            self._flush_journal()
+            if self._journal_size >= self._compaction_threshold:
+                self.compact()
+        self._write_generation()
+
+    def _read_generation(self) -> Union[str, None]:
+        """
+        Read the generation token from storage.
+
+        Returns:
+            Union[str, None]: The stored token, or None if there is none.
+        """
+        try:
+            return self._storage.load(_GENERATION_KEY).decode()
+        except NotFoundError:
+            return None
+
+    def _write_generation(self) -> None:
+        """
+        Write a fresh generation token to storage.
+        """
+        self._generation = uuid.uuid4().hex
+        self._storage.save(self._generation.encode(), _GENERATION_KEY)
+
+    def _flush_journal(self) -> None:
+        """
+        Append all pending records to the journal in a single write.
+        """
+        if not self._pending:
+            return
+        lines = "".join(json.dumps(record) + "\n" for record in self._pending)
+        self._storage.append(lines.encode(), _JOURNAL_KEY)
+        self._journal_size += len(self._pending)
+        self._pending = []
+
+    def _replay_journal(self) -> None:
+        """
+        Apply the records of the journal on top of the loaded snapshot.
+
+        A partially written trailing record is ignored and cut from the
+        journal, so that later appends start on a fresh line instead of
+        being glued to it and lost on the next replay.
+        """
+        try:
+            journal = self._storage.load(_JOURNAL_KEY)
+        except NotFoundError:
+            return
+        end = 0
+        while end < len(journal):
+            newline = journal.find(b"\n", end)
+            if newline < 0:
+                break
+            line = journal[end:newline]
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                collection, id = record["collection"], record["id"]
+                if record["op"] == "set":
+                    self._data.setdefault(collection, {})[id] = (
+                        record["entry"])
+                else:
+                    self._data.get(collection, {}).pop(id, None)
+                self._dirty.add((collection, id))
+                self._journal_size += 1
+            end = newline + 1
+        if end < len(journal):
+            self._storage.save(journal[:end], _JOURNAL_KEY)
+
     def _persist(self) -> None:
         """
-        Persist the data to storage.
+        Persist the dirty entries to storage.
         """
-        for collection, data in self._data.items():
-            if not data:
+        for collection, id in self._dirty:
+            key = f"{collection}{os.sep}{id}"
+            entry = self.get(collection, id)
+            if entry is not None:
+                self._storage.save(json.dumps(entry).encode(), key)
                 continue
-            for id, item in data.items():
-                self._storage.save(
-                    json.dumps(item).encode(), f"{collection}{os.sep}{id}"
-                )
-
-        keys = self._storage.list("")
-        for key in keys:
-            collection, id = key.split(os.sep)[-2:]
-            if not self._data.get(collection, id):
-                self._storage.delete(f"{collection}{os.sep}{id}")
+            try:
+                self._storage.delete(key)
+            except NotFoundError:
+                pass
+        self._dirty = set()
 
     def _load(self) -> None:
         """
         Load the data from storage.
+
+        The snapshot files are read first and the journal is replayed on
+        top of them. Outside journal mode a leftover journal is compacted
+        straight away.
         """
         self._data = {}
+        self._dirty = set()
+        self._pending = []
+        self._journal_size = 0
+        self._generation = self._read_generation()
         for key in self._storage.list(""):
             collection, id = key.split(os.sep)[-2:]
+            if collection == _META_COLLECTION:
+                continue
             data = self._storage.load(f"{collection}{os.sep}{id}")
             if collection not in self._data:
                 self._data[collection] = {}
             self._data[collection][id] = json.loads(data.decode())
+        self._replay_journal()
+        if not self._journal and self._dirty:
+            self.compact()
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 import base64
 import pandas as pd
 import io
@@ -19,7 +19,8 @@ class Artifact:
     version : str
         The version of the artifact.
     data : Optional[bytes]
-        The data of the artifact.
+        The data of the artifact, fetched through the loader on first
+        access when the artifact is lazy.
     tags : Optional[List[str]]
         The tags associated with the artifact.
     metadata : Optional[Dict[str, Any]]
@@ -35,7 +36,8 @@ class Artifact:
                  version: str = "1.0.0",
                  data: Optional[bytes] = None,
                  tags: Optional[List[str]] = None,
-                 metadata: Optional[Dict[str, Any]] = None) -> None:
+                 metadata: Optional[Dict[str, Any]] = None,
+                 loader: Optional[Callable[[], bytes]] = None) -> None:
         """
         Constructs all the necessary attributes for the artifact object.
 
@@ -55,20 +57,57 @@ class Artifact:
             The tags associated with the artifact (default is None).
         metadata : Optional[Dict[str, Any]], optional
             The metadata of the artifact (default is None).
+        loader : Optional[Callable[[], bytes]], optional
+            A callable returning the data, invoked on the first access of
+            `data` when no data is given (default is None).
         """
         self.name = name
         self.asset_path = asset_path
         self.version = version
         self.data = data
+        self._loader = loader
         self.type = type
         self.tags = [] if tags is None else tags
         self.metadata = {} if metadata is None else metadata
         self.id = f"{self.name}_{self.version}"
 
-    def read(self) -> pd.DataFrame:
+    @property
+    def data(self) -> Optional[bytes]:
+        """
+        Returns the data of the artifact, loading it on first access.
+
+        Returns
+        -------
+        Optional[bytes]
+            The data of the artifact.
+        """
+        if self._data is None and self._loader is not None:
+            self._data = self._loader()
+            self._loader = None
+        return self._data
+
+    @data.setter
+    def data(self, data: Optional[bytes]) -> None:
+        """
+        Sets the data of the artifact, replacing any pending loader.
+
+        Parameters
+        ----------
+        data : Optional[bytes]
+            The new data of the artifact.
+        """
+        self._data = data
+        self._loader = None
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Reads the data of the artifact and returns it as a pandas DataFrame.
 
+        Parameters
+        ----------
+        columns : Optional[List[str]], optional
+            The columns to read (default is None, reading all columns).
+
         Returns
         -------
         pd.DataFrame
@@ -85,9 +124,9 @@ class Artifact:
         if isinstance(self.data, bytes):
             try:
                 decoded = base64.b64decode(self.data)
-                return pd.read_csv(io.BytesIO(decoded))
+                return pd.read_csv(io.BytesIO(decoded), usecols=columns)
             except Exception:
-                return pd.read_csv(io.BytesIO(self.data))
+                return pd.read_csv(io.BytesIO(self.data), usecols=columns)
         else:
             raise ValueError("Data is not a string or bytes.")
 
@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Union
+import hashlib
+import io
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_MAX_BYTES = int(os.environ.get("AUTOOP_CACHE_BYTES", 1 << 30))
+
+
+def _sizeof(value: object) -> int:
+    """
+    Estimate the memory held by a cached value.
+
+    Args:
+        value (object): The value to measure.
+
+    Returns:
+        int: The estimated size in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "indptr"):
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_sizeof(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class DataCache:
+    """
+    A thread-safe LRU cache of decoded data bounded by a byte budget.
+
+    Values are shared between callers and must not be mutated in place.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes (int): The byte budget of the cache.
+        """
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self) -> int:
+        """
+        Get the byte budget of the cache.
+
+        Returns:
+            int: The byte budget.
+        """
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, max_bytes: int) -> None:
+        """
+        Set the byte budget of the cache, evicting entries if needed.
+
+        Args:
+            max_bytes (int): The new byte budget.
+        """
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._evict()
+
+    @property
+    def size(self) -> int:
+        """
+        Get the estimated number of bytes held by the cache.
+
+        Returns:
+            int: The estimated size in bytes.
+        """
+        return self._size
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        Get a value, marking it as most recently used.
+
+        Args:
+            key (Hashable): The key of the value.
+
+        Returns:
+            Optional[object]: The cached value, or None on a miss.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key: Hashable, value: object) -> object:
+        """
+        Store a value, evicting least recently used entries to fit it.
+
+        Values larger than the whole budget are not stored.
+
+        Args:
+            key (Hashable): The key of the value.
+            value (object): The value to store.
+
+        Returns:
+            object: The stored value.
+        """
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            if size <= self._max_bytes:
+                self._entries[key] = (value, size)
+                self._size += size
+                self._evict()
+        return value
+
+    def get_or_load(self, key: Hashable,
+                    loader: Callable[[], object]) -> object:
+        """
+        Get a value, loading and storing it on a miss.
+
+        Args:
+            key (Hashable): The key of the value.
+            loader (Callable[[], object]): Produces the value on a miss.
+
+        Returns:
+            object: The cached or freshly loaded value.
+        """
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, loader())
+        return value
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _evict(self) -> None:
+        """
+        Drop least recently used entries until the budget is respected.
+        """
+        while self._size > self._max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._size -= size
+
+
+_cache = DataCache()
+
+
+def get_cache() -> DataCache:
+    """
+    Get the process-wide data cache.
+
+    Its budget defaults to the AUTOOP_CACHE_BYTES environment variable,
+    or 1 GiB, and can be changed through `max_bytes`.
+
+    Returns:
+        DataCache: The shared cache.
+    """
+    return _cache
+
+
+def digest(data: Union[bytes, str]) -> str:
+    """
+    Compute the content digest used in cache keys.
+
+    Args:
+        data (Union[bytes, str]): Any bytes-like buffer or string.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest of the data.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_csv_cached(data: bytes) -> pd.DataFrame:
+    """
+    Parse CSV bytes through the shared cache, keyed by their digest.
+
+    The whole file is parsed at once, so that every column gets a single
+    type instead of one per internal chunk.
+
+    Args:
+        data (bytes): The CSV content.
+
+    Returns:
+        pd.DataFrame: The parsed CSV.
+    """
+    return _cache.get_or_load(
+        ("csv", digest(data)),
+        lambda: pd.read_csv(io.BytesIO(data), low_memory=False)
+    )
@@ -1,22 +1,66 @@
 from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.cache import digest, get_cache
+from typing import Callable, Iterator, List, Optional
 import base64
 import pandas as pd
-import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+_MIXED_TYPES = ["mixed", "mixed-integer"]
+
+
+def _homogenise_objects(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn object columns mixing Python types into string columns.
+
+    Parquet needs one type per column, while `pd.read_csv` yields mixed
+    columns for large files whose chunks were inferred differently.
+
+    :param data: The pandas DataFrame to store.
+    :return: The DataFrame, copied only if a column had to change.
+    """
+    mixed = [
+        column for column in data.columns
+        if data[column].dtype == object and pd.api.types.infer_dtype(
+            data[column], skipna=True) in _MIXED_TYPES
+    ]
+    if not mixed:
+        return data
+    data = data.copy()
+    for column in mixed:
+        values = data[column]
+        data[column] = values.where(values.isna(), values.astype(str))
+    return data
 
 
 class Dataset(Artifact):
     """
     A class used to represent a Dataset, inheriting from Artifact.
+
+    Data is stored as Parquet, recorded under the "encoding" metadata key.
+    Datasets without that key are read as legacy CSV. The data may be any
+    bytes-like buffer, such as a memory-mapped view from storage, and is
+    decoded straight from it without an intermediate copy.
+
+    Decoded frames are kept in the process-wide cache, keyed by the
+    dataset id and the content digest recorded under the "digest"
+    metadata key.
     """
 
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(self, *args,
+                 on_digest: Optional[Callable[[str], None]] = None,
+                 **kwargs) -> None:
         """
         Initialize the Dataset object.
 
         :param args: Additional positional arguments.
+        :param on_digest: Called with the digest when it is computed for
+            data that had none recorded, so that it can be persisted.
         :param kwargs: Additional keyword arguments.
         """
         super().__init__(type="dataset", *args, **kwargs)
+        self._on_digest = on_digest
 
     @staticmethod
     def from_dataframe(data: pd.DataFrame, name: str, asset_path: str,
@@ -30,30 +74,97 @@ class Dataset(Artifact):
         :param version: The version of the dataset.
         :return: A Dataset object.
         """
+        encoded = _homogenise_objects(data).to_parquet(index=False)
         return Dataset(
             name=name,
             asset_path=asset_path,
-            data=data.to_csv(index=False).encode(),
+            data=encoded,
             version=version,
+            metadata={"encoding": "parquet", "digest": digest(encoded)},
         )
 
-    def read(self) -> pd.DataFrame:
+    @property
+    def content_digest(self) -> str:
+        """
+        Get the digest of the stored data, computing it on first use.
+
+        :return: The hexadecimal SHA-256 digest of the data.
+        """
+        if "digest" not in self.metadata:
+            self.metadata["digest"] = digest(self.data)
+            if self._on_digest is not None:
+                self._on_digest(self.metadata["digest"])
+        return self.metadata["digest"]
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Return a pandas DataFrame from the stored data.
 
+        The returned frame may be shared through the cache and must not
+        be modified in place.
+
+        :param columns: The columns to read. All columns are read when
+            omitted; with Parquet the other columns are never decoded.
+        :return: A pandas DataFrame.
+        """
+        key = ("dataset", self.id, self.content_digest)
+        cache = get_cache()
+        frame = cache.get(key)
+        if frame is not None:
+            return frame if columns is None else frame[columns]
+        if columns is None:
+            return cache.put(key, self._decode())
+        return cache.get_or_load(
+            key + (tuple(columns),), lambda: self._decode(columns))
+
+    def read_chunks(self, columns: Optional[List[str]] = None,
+                    chunk_size: int = 65536) -> Iterator[pd.DataFrame]:
+        """
+        Read the stored data as a sequence of DataFrames.
+
+        Only one chunk is decoded at a time and nothing is cached, so
+        datasets larger than memory can be streamed.
+
+        :param columns: The columns to read, or None for all of them.
+        :param chunk_size: The maximum number of rows per chunk.
+        :return: An iterator over the chunks.
+        """
+        data = self.data
+        if isinstance(data, str):
+            data = base64.b64decode(data)
+        buffer = pa.BufferReader(pa.py_buffer(data))
+        if self.metadata.get("encoding") == "parquet":
+            batches = pq.ParquetFile(buffer).iter_batches(
+                batch_size=chunk_size, columns=columns)
+            for batch in batches:
+                yield batch.to_pandas()
+            return
+        yield from pd.read_csv(buffer, usecols=columns, chunksize=chunk_size)
+
+    def _decode(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Decode the stored data into a pandas DataFrame.
+
+        :param columns: The columns to decode, or None for all of them.
         :return: A pandas DataFrame.
         """
-        data: bytes = self.data
+        data = self.data
         if isinstance(data, str):
             data = base64.b64decode(data)
-        return pd.read_csv(io.BytesIO(data))
+        buffer = pa.BufferReader(pa.py_buffer(data))
+        if self.metadata.get("encoding") == "parquet":
+            return pq.read_table(buffer, columns=columns).to_pandas(
+                split_blocks=True, self_destruct=True)
+        return pd.read_csv(buffer, usecols=columns)
 
     def save(self, data: pd.DataFrame) -> bytes:
         """
-        Save the pandas DataFrame as bytes.
+        Save the pandas DataFrame as Parquet bytes.
 
         :param data: The pandas DataFrame to save.
         :return: The saved data as bytes.
         """
-        bytes = data.to_csv(index=False).encode()
-        return super().save(bytes)
+        self.data = _homogenise_objects(data).to_parquet(index=False)
+        self.metadata["encoding"] = "parquet"
+        self.metadata["digest"] = digest(self.data)
+        return self.data
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 import numpy as np
 
 
@@ -8,9 +9,12 @@ METRICS = [
     "r_squared",
     "precision",
     "recall",
-    "accuracy"
+    "accuracy",
+    "f1"
 ]
 
+_BLOCK_SIZE = 1 << 16
+
 
 def get_metric(name: str) -> 'Metric':
     """
@@ -39,6 +43,237 @@ def get_metric(name: str) -> 'Metric':
         return Precision()
     if name.lower() == "recall":
         return Recall()
+    if name.lower() == "f1":
+        return F1Score()
+
+
+def _encode_labels(labels: np.ndarray) -> np.ndarray:
+    """
+    Turn labels into a 1D array, one-hot rows becoming class indices.
+
+    All-zero rows, such as unseen categories, become -1 so that they
+    never count as a match for class 0.
+
+    Parameters:
+    labels (np.ndarray): Labels of shape (n,), (n, 1) or one-hot (n, k).
+
+    Returns:
+    np.ndarray: One label per sample.
+    """
+    labels = np.asarray(labels)
+    if labels.ndim == 2 and labels.shape[1] > 1:
+        return np.where(labels.any(axis=1), np.argmax(labels, axis=1), -1)
+    return labels.ravel()
+
+
+class ConfusionMatrix:
+    """
+    A confusion matrix built in a single bincount pass.
+
+    Rows are indexed by the true class and columns by the predicted one.
+    Integer labels below the number of labels index the matrix directly,
+    classes then being every integer up to the largest label; other
+    labels are encoded with `np.unique`.
+    All classification metrics derive from it.
+    """
+
+    def __init__(
+            self, prediction: np.ndarray, ground_truth: np.ndarray) -> None:
+        """
+        Build the confusion matrix.
+
+        Parameters:
+        prediction (np.ndarray): The predicted labels or one-hot rows.
+        ground_truth (np.ndarray): The true labels or one-hot rows.
+        """
+        prediction = _encode_labels(prediction)
+        ground_truth = _encode_labels(ground_truth)
+        labels = np.concatenate([ground_truth, prediction])
+        # Small non-negative integers are their own codes; larger ones
+        # would blow up the matrix and are encoded like any other label.
+        if labels.dtype.kind in "iub" and (labels.size == 0 or (
+                labels.min() >= 0 and labels.max() < labels.size)):
+            codes = labels.astype(np.intp)
+            n_classes = int(codes.max()) + 1 if codes.size else 0
+            self.classes = np.arange(n_classes)
+        else:
+            self.classes, codes = np.unique(labels, return_inverse=True)
+            n_classes = len(self.classes)
+        n_samples = len(ground_truth)
+        self.matrix = np.bincount(
+            codes[:n_samples] * n_classes + codes[n_samples:],
+            minlength=n_classes * n_classes,
+        ).reshape(n_classes, n_classes)
+
+    @property
+    def accuracy(self) -> float:
+        """
+        The fraction of correctly predicted samples.
+
+        Returns:
+        float: The accuracy.
+        """
+        total = self.matrix.sum()
+        return float(np.trace(self.matrix) / total) if total else 0.0
+
+    def macro(self, per_class: np.ndarray) -> float:
+        """
+        Average a per-class score over the classes of the ground truth.
+
+        Parameters:
+        per_class (np.ndarray): A score for every class.
+
+        Returns:
+        float: The macro average.
+        """
+        present = self.matrix.sum(axis=1) > 0
+        return float(per_class[present].mean()) if present.any() else 0.0
+
+    def _per_class(self, totals: np.ndarray) -> np.ndarray:
+        """
+        Divide the true positives by per-class totals, zero when empty.
+
+        Parameters:
+        totals (np.ndarray): The denominator of every class.
+
+        Returns:
+        np.ndarray: The ratio for every class.
+        """
+        true_positives = np.diag(self.matrix)
+        return np.divide(true_positives, totals,
+                         out=np.zeros(len(totals)), where=totals > 0)
+
+    @property
+    def precision(self) -> np.ndarray:
+        """
+        The precision of every class.
+
+        Returns:
+        np.ndarray: The per-class precision.
+        """
+        return self._per_class(self.matrix.sum(axis=0))
+
+    @property
+    def recall(self) -> np.ndarray:
+        """
+        The recall of every class.
+
+        Returns:
+        np.ndarray: The per-class recall.
+        """
+        return self._per_class(self.matrix.sum(axis=1))
+
+    @property
+    def f1(self) -> np.ndarray:
+        """
+        The F1 score of every class.
+
+        Returns:
+        np.ndarray: The per-class F1 score.
+        """
+        precision, recall = self.precision, self.recall
+        total = precision + recall
+        return np.divide(2 * precision * recall, total,
+                         out=np.zeros(len(total)), where=total > 0)
+
+
+class RegressionStatistics:
+    """
+    Sufficient statistics of the regression metrics, accumulated in chunks.
+
+    Only the count, the mean and the sum of squared deviations of the
+    ground truth, and the residual sum of squares are kept. Chunks are
+    merged with Chan's parallel update, so predictions too large to hold
+    at once can be scored chunk by chunk.
+    Accumulation is always in float64, whatever the dtype of the inputs.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize empty statistics.
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.total_sum_of_squares = 0.0
+        self.residual_sum_of_squares = 0.0
+
+    def update(self, prediction: np.ndarray,
+               ground_truth: np.ndarray) -> 'RegressionStatistics':
+        """
+        Add a chunk of predictions to the statistics.
+
+        Both arrays are flattened, so (n,) and (n, 1) shapes mix freely.
+        Large chunks are processed in fixed-size blocks to bound the
+        temporary arrays.
+
+        Parameters:
+        prediction (np.ndarray): The predicted values.
+        ground_truth (np.ndarray): The ground truth values.
+
+        Returns:
+        RegressionStatistics: These statistics.
+        """
+        prediction = np.ravel(prediction)
+        ground_truth = np.ravel(ground_truth)
+        for start in range(0, len(ground_truth), _BLOCK_SIZE):
+            truth = ground_truth[start:start + _BLOCK_SIZE].astype(
+                np.float64)
+            residual = truth - prediction[start:start + _BLOCK_SIZE]
+            block = RegressionStatistics()
+            block.count = len(truth)
+            block.mean = float(truth.mean())
+            truth -= block.mean
+            block.total_sum_of_squares = float(np.dot(truth, truth))
+            block.residual_sum_of_squares = float(np.dot(residual, residual))
+            self.merge(block)
+        return self
+
+    def merge(self, other: 'RegressionStatistics') -> 'RegressionStatistics':
+        """
+        Fold the statistics of another chunk into these.
+
+        Parameters:
+        other (RegressionStatistics): The statistics to add.
+
+        Returns:
+        RegressionStatistics: These statistics.
+        """
+        count = self.count + other.count
+        if count == 0:
+            return self
+        delta = other.mean - self.mean
+        self.total_sum_of_squares += other.total_sum_of_squares + (
+            delta * delta * self.count * other.count / count)
+        self.mean += delta * other.count / count
+        self.residual_sum_of_squares += other.residual_sum_of_squares
+        self.count = count
+        return self
+
+    @property
+    def mean_squared_error(self) -> float:
+        """
+        The mean of the squared residuals.
+
+        Returns:
+        float: The mean squared error.
+        """
+        if self.count == 0:
+            return 0.0
+        return self.residual_sum_of_squares / self.count
+
+    @property
+    def r_squared(self) -> float:
+        """
+        The coefficient of determination.
+
+        A constant ground truth gives 1 for a perfect fit and 0 otherwise.
+
+        Returns:
+        float: The R-squared value.
+        """
+        if self.total_sum_of_squares == 0:
+            return 1.0 if self.residual_sum_of_squares == 0 else 0.0
+        return 1 - self.residual_sum_of_squares / self.total_sum_of_squares
 
 
 class Metric(ABC):
@@ -79,7 +314,20 @@ class Accuracy(Metric):
         Returns:
         float: The accuracy of the predictions.
         """
-        return np.mean(ground_truth == prediction)
+        return self.from_confusion_matrix(
+            ConfusionMatrix(prediction, ground_truth))
+
+    def from_confusion_matrix(self, matrix: ConfusionMatrix) -> float:
+        """
+        Evaluate the accuracy metric from a confusion matrix.
+
+        Parameters:
+        matrix (ConfusionMatrix): The confusion matrix of the predictions.
+
+        Returns:
+        float: The accuracy of the predictions.
+        """
+        return matrix.accuracy
 
 
 class MeanSquaredError(Metric):
@@ -99,7 +347,20 @@ class MeanSquaredError(Metric):
         Returns:
         float: The mean squared error of the predictions.
         """
-        return np.mean((prediction - ground_truth) ** 2)
+        return self.from_statistics(
+            RegressionStatistics().update(prediction, ground_truth))
+
+    def from_statistics(self, statistics: RegressionStatistics) -> float:
+        """
+        Evaluate the mean squared error from accumulated statistics.
+
+        Parameters:
+        statistics (RegressionStatistics): The accumulated statistics.
+
+        Returns:
+        float: The mean squared error of the predictions.
+        """
+        return statistics.mean_squared_error
 
 
 class RootMeanSquaredError(MeanSquaredError):
@@ -119,7 +380,19 @@ class RootMeanSquaredError(MeanSquaredError):
         Returns:
         float: The root mean squared error of the predictions.
         """
-        return np.sqrt(super().evaluate(prediction, ground_truth))
+        return super().evaluate(prediction, ground_truth)
+
+    def from_statistics(self, statistics: RegressionStatistics) -> float:
+        """
+        Evaluate the root mean squared error from accumulated statistics.
+
+        Parameters:
+        statistics (RegressionStatistics): The accumulated statistics.
+
+        Returns:
+        float: The root mean squared error of the predictions.
+        """
+        return float(np.sqrt(statistics.mean_squared_error))
 
 
 class Rsquared(Metric):
@@ -139,15 +412,26 @@ class Rsquared(Metric):
         Returns:
         float: The R-squared value of the predictions.
         """
-        y_mean = np.mean(ground_truth)
-        total = np.sum((ground_truth - y_mean) ** 2)
-        residual = np.sum((ground_truth - prediction) ** 2)
-        return 1 - (residual / total)
+        return self.from_statistics(
+            RegressionStatistics().update(prediction, ground_truth))
+
+    def from_statistics(self, statistics: RegressionStatistics) -> float:
+        """
+        Evaluate the R-squared metric from accumulated statistics.
+
+        Parameters:
+        statistics (RegressionStatistics): The accumulated statistics.
+
+        Returns:
+        float: The R-squared value of the predictions.
+        """
+        return statistics.r_squared
 
 
 class Precision(Metric):
     """
-    Class to evaluate the precision metric.
+    Class to evaluate the precision metric, macro-averaged over the classes
+    of the ground truth.
     """
 
     def evaluate(
@@ -162,23 +446,26 @@ class Precision(Metric):
         Returns:
         float: The precision of the predictions.
         """
-        classes = np.unique(ground_truth)
-        precisions = []
-        for category in classes:
-            true_positives = np.sum(
-                (prediction == category) & (ground_truth == category)
-            )
-            predicted_positives = np.sum(prediction == category)
-            if predicted_positives == 0:
-                precisions.append(0)
-            else:
-                precisions.append(true_positives / predicted_positives)
-        return precisions / len(classes)
+        return self.from_confusion_matrix(
+            ConfusionMatrix(prediction, ground_truth))
+
+    def from_confusion_matrix(self, matrix: ConfusionMatrix) -> float:
+        """
+        Evaluate the precision from a confusion matrix.
+
+        Parameters:
+        matrix (ConfusionMatrix): The confusion matrix of the predictions.
+
+        Returns:
+        float: The precision of the predictions.
+        """
+        return matrix.macro(matrix.precision)
 
 
 class Recall(Metric):
     """
-    Class to evaluate the recall metric.
+    Class to evaluate the recall metric, macro-averaged over the classes
+    of the ground truth.
     """
 
     def evaluate(
@@ -193,19 +480,84 @@ class Recall(Metric):
         Returns:
         float: The recall of the predictions.
         """
-        classes = np.unique(ground_truth)
-        recall_list = []
-        for category in classes:
-            true_positives = np.sum(
-                (prediction == category) & (ground_truth == category)
-            )
-            false_negatives = np.sum(
-                (ground_truth == category) & (prediction != category)
-            )
-            if true_positives + false_negatives == 0:
-                recall_list.append(0)
-            else:
-                recall_list.append(
-                    true_positives / (true_positives + false_negatives)
-                )
-        return recall_list / len(classes)
+        return self.from_confusion_matrix(
+            ConfusionMatrix(prediction, ground_truth))
+
+    def from_confusion_matrix(self, matrix: ConfusionMatrix) -> float:
+        """
+        Evaluate the recall from a confusion matrix.
+
+        Parameters:
+        matrix (ConfusionMatrix): The confusion matrix of the predictions.
+
+        Returns:
+        float: The recall of the predictions.
+        """
+        return matrix.macro(matrix.recall)
+
+
+class F1Score(Metric):
+    """
+    Class to evaluate the F1 score, macro-averaged over the classes of the
+    ground truth.
+    """
+
+    def evaluate(
+            self, prediction: np.ndarray, ground_truth: np.ndarray) -> float:
+        """
+        Evaluate the F1 score.
+
+        Parameters:
+        prediction (np.ndarray): The predicted values.
+        ground_truth (np.ndarray): The ground truth values.
+
+        Returns:
+        float: The F1 score of the predictions.
+        """
+        return self.from_confusion_matrix(
+            ConfusionMatrix(prediction, ground_truth))
+
+    def from_confusion_matrix(self, matrix: ConfusionMatrix) -> float:
+        """
+        Evaluate the F1 score from a confusion matrix.
+
+        Parameters:
+        matrix (ConfusionMatrix): The confusion matrix of the predictions.
+
+        Returns:
+        float: The F1 score of the predictions.
+        """
+        return matrix.macro(matrix.f1)
+
+
+def evaluate_metrics(metrics: List[Metric], prediction: np.ndarray,
+                     ground_truth: np.ndarray) -> List[float]:
+    """
+    Evaluate several metrics on the same predictions.
+
+    The confusion matrix and the regression statistics are each computed
+    at most once and shared by the metrics that derive from them.
+
+    Parameters:
+    metrics (List[Metric]): The metrics to evaluate.
+    prediction (np.ndarray): The predicted values.
+    ground_truth (np.ndarray): The ground truth values.
+
+    Returns:
+    List[float]: The result of every metric, in order.
+    """
+    matrix = statistics = None
+    results = []
+    for metric in metrics:
+        if hasattr(metric, "from_confusion_matrix"):
+            if matrix is None:
+                matrix = ConfusionMatrix(prediction, ground_truth)
+            results.append(metric.from_confusion_matrix(matrix))
+        elif hasattr(metric, "from_statistics"):
+            if statistics is None:
+                statistics = RegressionStatistics().update(
+                    prediction, ground_truth)
+            results.append(metric.from_statistics(statistics))
+        else:
+            results.append(metric.evaluate(prediction, ground_truth))
+    return results
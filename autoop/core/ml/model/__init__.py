@@ -34,14 +34,14 @@ CLASSIFICATION_MODELS = [
 ]
 
 
-def get_model(name: str) -> Type[Model]:
+def get_model(name: str, **hyperparameters) -> Type[Model]:
     """
     Factory function to get a model by task type and model name.
 
     Parameters:
-    task_type (str): The type of task ('classification' or 'regression').
-    model_name (str): The name of the model.
-    **hyperparameters: Additional hyperparameters for the model.
+    name (str): The name of the model.
+    **hyperparameters: Additional hyperparameters for the model, such as
+        `n_jobs` and `n_processes` for "random_forest".
 
     Returns:
     Model: An instance of the requested model.
@@ -67,4 +67,4 @@ def get_model(name: str) -> Type[Model]:
     model = model_map[name]
     task_type = "classification" if (
         name in CLASSIFICATION_MODELS) else "regression"
-    return model(name=name, type=task_type)
+    return model(name=name, type=task_type, **hyperparameters)
@@ -1,15 +1,130 @@
 from autoop.core.ml.model.model import Model
+from autoop.core.ml.parallel import get_cpu_budget
 import numpy as np
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from copy import deepcopy
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Tuple
+import weakref
+from sklearn.neighbors import BallTree, KDTree
+from threadpoolctl import threadpool_limits
+import multiprocessing
+
+
+_BLOCK_BYTES = 64 * 1024 * 1024
+_MIN_INDEX_SAMPLES = 1000
+_KD_TREE_MAX_DIMENSIONS = 15
+_BALL_TREE_MAX_DIMENSIONS = 40
+_MIN_PROCESS_WORK = 1 << 27
+ALGORITHMS = ["auto", "brute", "kd_tree", "ball_tree"]
+_START_METHOD = ("forkserver" if "forkserver" in
+                 multiprocessing.get_all_start_methods() else "spawn")
+
+_worker_state = {}
+
+
+def _attach_worker(memory_name: str, shape: Tuple[int, int],
+                   dtype: np.dtype, squared_norms: np.ndarray,
+                   labels: np.ndarray, n_classes: int, k: int) -> None:
+    """
+    Initializes a scoring process around the shared training matrix.
+
+    BLAS is limited to one thread, since the processes themselves are
+    the workers reserved from the CPU budget.
+
+    Parameters
+    ----------
+    memory_name : str
+        The name of the shared memory block holding the observations.
+    shape : Tuple[int, int]
+        The shape of the observations.
+    dtype : np.dtype
+        The dtype of the observations.
+    squared_norms : np.ndarray
+        The squared norms of the observations.
+    labels : np.ndarray
+        The encoded labels of the observations.
+    n_classes : int
+        The number of distinct labels.
+    k : int
+        The number of neighbours to consider.
+    """
+    _worker_state["limits"] = threadpool_limits(limits=1)
+    memory = SharedMemory(name=memory_name)
+    model = KNearestNeighbors(k=k, algorithm="brute")
+    model.observations = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    model._squared_norms = squared_norms
+    model._labels = labels
+    model._classes = np.arange(n_classes)
+    _worker_state["memory"] = memory
+    _worker_state["model"] = model
+
+
+def _release_workers(pool: ProcessPoolExecutor,
+                     memory: SharedMemory) -> None:
+    """
+    Shuts down a scoring pool and frees its shared training matrix.
+
+    Parameters
+    ----------
+    pool : ProcessPoolExecutor
+        The scoring processes.
+    memory : SharedMemory
+        The shared memory block holding the observations.
+    """
+    pool.shutdown()
+    memory.close()
+    memory.unlink()
+
+
+def _score_in_worker(block: np.ndarray) -> np.ndarray:
+    """
+    Scores a block of observations inside a scoring process.
+
+    Parameters
+    ----------
+    block : np.ndarray
+        A 2D block of observations.
+
+    Returns
+    -------
+    np.ndarray
+        The encoded label chosen for each row of the block.
+    """
+    return _worker_state["model"]._score(block)
 
 
 class KNearestNeighbors(Model):
     """
     K-Nearest Neighbors classifier.
+
+    Queries are scored in blocks: the squared distances of a block to all
+    training points are computed with one matrix product, the k nearest
+    are selected with `argpartition` and the vote is a `bincount` over
+    integer-encoded labels. Memory is bounded by the block size.
+
+    For larger, low-dimensional training sets a KD-tree or ball tree is
+    built at fit time instead, answering queries in sub-linear time. The
+    tree is pickled along with the model, so it is never rebuilt when a
+    saved model is loaded.
+
+    With `n_jobs` above one the blocks are scored concurrently and merged
+    in order: brute-force blocks in a process pool that maps the training
+    matrix from shared memory, tree queries in a thread pool sharing the
+    tree, since scikit-learn releases the GIL while querying it. Workers
+    are reserved from the process-wide CPU budget, so concurrent
+    pipelines share the machine instead of oversubscribing it.
+
+    The process pool and its shared memory are kept between `predict`
+    calls, until the model is refitted, pickled or `close`d. Brute-force
+    workloads too small to repay starting the processes are scored in the
+    calling process.
     """
 
-    def __init__(self, k: int = 3, name: str = "K-Nearest Neighbors",
+    def __init__(self, k: int = 3, batch_size: int = None,
+                 algorithm: str = "auto", n_jobs: int = 1,
+                 name: str = "K-Nearest Neighbors",
                  type: str = "classification") -> None:
         """
         Initialize the K-Nearest Neighbors model with given hyperparameters.
@@ -19,6 +134,16 @@ class KNearestNeighbors(Model):
         k : int, optional
             The number of nearest neighbors to consider for classification.
             Defaults to 3.
+        batch_size : int, optional
+            The number of query rows scored per block. Defaults to as many
+            rows as fit a 64 MiB distance or neighbour block.
+        algorithm : str, optional
+            One of "brute", "kd_tree", "ball_tree" or "auto", which picks
+            one from the number of samples and dimensions at fit time.
+            Defaults to "auto".
+        n_jobs : int, optional
+            The number of workers scoring query blocks, -1 meaning the
+            whole CPU budget. Defaults to 1.
         name : str, optional
             The name of the model. Defaults to "K-Nearest Neighbors".
         type : str, optional
@@ -26,7 +151,17 @@ class KNearestNeighbors(Model):
 
         """
         super().__init__(name=name, type=type)
+        if algorithm not in ALGORITHMS:
+            raise ValueError(
+                f"Unsupported algorithm: {algorithm}. Supported algorithms "
+                f"are: {ALGORITHMS}"
+            )
         self.k = k
+        self.batch_size = batch_size
+        self.algorithm = algorithm
+        self.n_jobs = n_jobs
+        self._tree = None
+        self._workers = None
         self.observations = None
         self.ground_truth = None
         self._parameters = {}
@@ -64,7 +199,8 @@ class KNearestNeighbors(Model):
         observations : np.ndarray
             A 2D array of input data.
         ground_truth : np.ndarray
-            A 1D array of target values.
+            A 1D array of target values, or a 2D array with one
+            (for example one-hot encoded) label row per observation.
 
         Raises
         ------
@@ -72,22 +208,120 @@ class KNearestNeighbors(Model):
             If the number of observations does not match the
               number of ground truth labels.
         """
+        observations = np.asarray(observations)
+        ground_truth = np.asarray(ground_truth)
         if observations.shape[0] != ground_truth.shape[0]:
             raise ValueError(
                 """The number of observations must match the
                   number of ground truth labels."""
             )
 
-        if len(ground_truth.shape) > 1:
+        if ground_truth.ndim > 1 and ground_truth.shape[1] == 1:
             ground_truth = ground_truth.flatten()
 
+        self.close()
         self.observations = observations
         self.ground_truth = ground_truth
+        self._encode_training_data()
+        algorithm = self._select_algorithm(observations)
+        self._tree = None
+        if algorithm == "kd_tree":
+            self._tree = KDTree(observations)
+        elif algorithm == "ball_tree":
+            self._tree = BallTree(observations)
         self._parameters = {
             "observations": observations,
-            "ground_truth": ground_truth
+            "ground_truth": ground_truth,
+            "algorithm": algorithm,
         }
 
+    def close(self) -> None:
+        """
+        Shuts down the scoring processes and frees the shared memory
+        holding the training matrix, if they were started.
+        """
+        if self._workers is not None:
+            self._workers[2]()
+            self._workers = None
+
+    def __getstate__(self) -> dict:
+        """
+        Gets the attributes to pickle, without the scoring processes.
+
+        Returns
+        -------
+        dict
+            The attributes of the model.
+        """
+        state = self.__dict__.copy()
+        state["_workers"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores a pickled model.
+
+        Models pickled before the encoded training state existed only
+        hold their observations and ground truth; the labels and norms
+        are derived from them again and queries are scored by brute
+        force.
+
+        Parameters
+        ----------
+        state : dict
+            The pickled attributes of the model.
+        """
+        self.__dict__.update(state)
+        self.__dict__.setdefault("batch_size", None)
+        self.__dict__.setdefault("algorithm", "auto")
+        self.__dict__.setdefault("n_jobs", 1)
+        self.__dict__.setdefault("_tree", None)
+        self.__dict__.setdefault("_workers", None)
+        if "_labels" not in state and self.observations is not None:
+            self.observations = np.asarray(self.observations)
+            self._encode_training_data()
+
+    def _encode_training_data(self) -> None:
+        """
+        Encodes the labels as integers and computes the squared norms of
+        the training observations.
+        """
+        ground_truth = np.asarray(self.ground_truth)
+        if ground_truth.ndim == 1:
+            self._classes, labels = np.unique(
+                ground_truth, return_inverse=True)
+        else:
+            self._classes, labels = np.unique(
+                ground_truth, axis=0, return_inverse=True)
+        self._labels = labels.reshape(-1)
+        self._squared_norms = np.einsum(
+            "ij,ij->i", self.observations, self.observations)
+
+    def _select_algorithm(self, observations: np.ndarray) -> str:
+        """
+        Resolves the neighbour search algorithm for the training data.
+
+        Parameters
+        ----------
+        observations : np.ndarray
+            A 2D array of input data.
+
+        Returns
+        -------
+        str
+            "brute", "kd_tree" or "ball_tree".
+        """
+        if self.algorithm != "auto":
+            return self.algorithm
+        n_samples, n_dimensions = observations.shape
+        if n_samples < _MIN_INDEX_SAMPLES or self.k * 2 >= n_samples:
+            return "brute"
+        if n_dimensions <= _KD_TREE_MAX_DIMENSIONS:
+            return "kd_tree"
+        if n_dimensions <= _BALL_TREE_MAX_DIMENSIONS:
+            return "ball_tree"
+        return "brute"
+
     def predict(self, observations: np.ndarray) -> np.ndarray:
         """
         Predicts the labels of the given observations
@@ -102,34 +336,187 @@ class KNearestNeighbors(Model):
         Returns
         -------
         np.ndarray
-            A 1D array of the predicted labels.
-              The length of the array is equal to
-            the number of observations.
+            The predicted labels, one per observation, in the
+              shape of the ground truth rows seen during fitting.
         """
+        observations = np.asarray(observations)
         if len(observations.shape) == 1:
             observations = observations.reshape(1, -1)
+        if np.issubdtype(self.observations.dtype, np.floating):
+            # Queries share the dtype of the fitted observations, so
+            # float32 data keeps float32 distance products.
+            observations = observations.astype(
+                self.observations.dtype, copy=False)
 
-        predictions = [self._predict_single(x) for x in observations]
-        return np.array(predictions)
+        row_bytes = 8 * self.k
+        if self._tree is None:
+            row_bytes = self.observations.dtype.itemsize * (
+                self.observations.shape[0])
+        batch_size = self.batch_size or max(1, _BLOCK_BYTES // row_bytes)
+        blocks = [
+            observations[start:start + batch_size]
+            for start in range(0, observations.shape[0], batch_size)
+        ]
+        budget = get_cpu_budget()
+        requested = min(budget.resolve(self.n_jobs), max(1, len(blocks)))
+        work = observations.shape[0] * self.observations.size
+        if self._tree is None and work < _MIN_PROCESS_WORK:
+            # Starting worker processes would cost more than the scoring.
+            requested = 1
+        with budget.reserve(requested) as n_jobs:
+            if n_jobs <= 1:
+                results = [self._score(block) for block in blocks]
+            elif self._tree is not None:
+                with ThreadPoolExecutor(n_jobs) as pool:
+                    results = list(pool.map(self._score, blocks))
+            else:
+                results = self._score_in_processes(blocks, n_jobs)
+        if not results:
+            return self._classes[np.empty(0, dtype=np.intp)]
+        return self._classes[np.concatenate(results)]
 
-    def _predict_single(self, observation: np.ndarray) -> np.ndarray:
+    def _score(self, block: np.ndarray) -> np.ndarray:
         """
-        Predicts the label of a single observation using the
-          K-Nearest Neighbors
-        algorithm.
+        Scores a block of observations.
+
+        Parameters
+        ----------
+        block : np.ndarray
+            A 2D block of observations.
+
+        Returns
+        -------
+        np.ndarray
+            The encoded label chosen for each row of the block.
+        """
+        return self._vote(self._neighbours(block))
+
+    def _score_in_processes(self, blocks: List[np.ndarray],
+                            n_jobs: int) -> List[np.ndarray]:
+        """
+        Scores blocks in a process pool sharing the training matrix.
+
+        The observations are copied once into shared memory, which every
+        worker maps read-only instead of receiving its own pickled copy.
+        Workers are started from a fork server where available, or
+        spawned, rather than forked from a possibly threaded process. The
+        pool is reused by later calls asking for as many workers.
+
+        Parameters
+        ----------
+        blocks : List[np.ndarray]
+            The blocks of observations to score.
+        n_jobs : int
+            The number of worker processes.
+
+        Returns
+        -------
+        List[np.ndarray]
+            The encoded labels of each block, in the order of the blocks.
+        """
+        if self._workers is None or self._workers[0] != n_jobs:
+            self.close()
+            self._workers = (n_jobs, *self._start_workers(n_jobs))
+        chunksize = max(1, len(blocks) // (4 * n_jobs))
+        try:
+            return list(self._workers[1].map(_score_in_worker, blocks,
+                                             chunksize=chunksize))
+        except BrokenProcessPool:
+            self.close()
+            raise
+
+    def _start_workers(
+            self, n_jobs: int
+    ) -> Tuple[ProcessPoolExecutor, weakref.finalize]:
+        """
+        Starts scoring processes around a shared copy of the observations.
+
+        Parameters
+        ----------
+        n_jobs : int
+            The number of worker processes.
+
+        Returns
+        -------
+        Tuple[ProcessPoolExecutor, weakref.finalize]
+            The pool, and a finalizer releasing it and the shared memory,
+            also run when the model is garbage collected or at exit.
+        """
+        memory = SharedMemory(create=True, size=self.observations.nbytes)
+        try:
+            shared = np.ndarray(self.observations.shape,
+                                dtype=self.observations.dtype,
+                                buffer=memory.buf)
+            shared[:] = self.observations
+            del shared
+            initargs = (memory.name, self.observations.shape,
+                        self.observations.dtype, self._squared_norms,
+                        self._labels, len(self._classes), self.k)
+            context = multiprocessing.get_context(_START_METHOD)
+            pool = ProcessPoolExecutor(n_jobs, mp_context=context,
+                                       initializer=_attach_worker,
+                                       initargs=initargs)
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+        return pool, weakref.finalize(self, _release_workers, pool, memory)
+
+    def _neighbours(self, block: np.ndarray) -> np.ndarray:
+        """
+        Finds the indices of the k nearest training points of each row.
+
+        Parameters
+        ----------
+        block : np.ndarray
+            A 2D block of observations.
+
+        Returns
+        -------
+        np.ndarray
+            An array of shape (len(block), k) with training indices,
+              ordered from nearest to farthest.
+        """
+        k = min(self.k, self.observations.shape[0])
+        if self._tree is not None:
+            return self._tree.query(block, k=k, return_distance=False)
+        distances = block @ self.observations.T
+        distances *= -2
+        distances += self._squared_norms
+        if k < self.observations.shape[0]:
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.broadcast_to(np.arange(k), (block.shape[0], k))
+        order = np.argsort(
+            np.take_along_axis(distances, nearest, axis=1), axis=1)
+        return np.take_along_axis(nearest, order, axis=1)
+
+    def _vote(self, neighbours: np.ndarray) -> np.ndarray:
+        """
+        Takes the majority vote over the labels of the neighbours.
+
+        Ties go to the label of the nearest of the tied neighbours.
 
         Parameters
         ----------
-        observation : np.ndarray
-            The observation to predict the label of.
+        neighbours : np.ndarray
+            An array of shape (n, k) with training indices, ordered from
+            nearest to farthest.
 
         Returns
         -------
         np.ndarray
-            The predicted label of the observation.
+            The encoded label chosen for each of the n rows.
         """
-        distances = np.linalg.norm(self.observations - observation, axis=1)
-        k_indices = np.argsort(distances)[:self.k]
-        k_nearest_labels = self.ground_truth[k_indices]
-        most_common = pd.Series(k_nearest_labels).value_counts()
-        return most_common.idxmax()
+        n, k = neighbours.shape
+        n_classes = len(self._classes)
+        labels = self._labels[neighbours]
+        rows = np.arange(n)
+        counts = np.bincount(
+            (labels + rows[:, None] * n_classes).ravel(),
+            minlength=n * n_classes,
+        ).reshape(n, n_classes)
+        first = np.full((n, n_classes), k)
+        for rank in range(k - 1, -1, -1):
+            first[rows, labels[:, rank]] = rank
+        return (counts * (k + 1) - first).argmax(axis=1)
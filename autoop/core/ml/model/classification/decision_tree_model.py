@@ -1,21 +1,29 @@
 from autoop.core.ml.model.model import Model
+from autoop.core.ml.model.classification.flat_tree import FlatForestMixin
+from typing import List
 import numpy as np
+from scipy import sparse as sp
 from sklearn.tree import DecisionTreeClassifier
 from copy import deepcopy
 
 
-class DecisionTree(Model):
+class DecisionTree(FlatForestMixin, Model):
     """
     Decision Tree model for classification tasks.
 
+    Predictions go through the flat arrays of `FlatForestMixin`.
+
     Attributes:
         max_depth (int): Maximum depth of the tree.
         min_samples_split (int): Minimum samples to split node.
         name (str): Name of the model.
         type (str): Type of the model.
         _model (DecisionTreeClassifier): The DecisionTreeClassifier instance.
+        _flat (FlatForest): The fitted tree as flat arrays.
     """
 
+    supports_sparse = True
+
     def __init__(self,
                  max_depth: int = None,
                  min_samples_split: int = 2,
@@ -38,21 +46,25 @@ class DecisionTree(Model):
             "min_samples_split": self.min_samples_split,
         }
         self._model = DecisionTreeClassifier(**self._parameters)
+        self._flat = None
 
     def fit(self, X: np.ndarray, y: np.ndarray) -> None:
         """
         Fits the DecisionTree model to the provided data.
 
         Args:
-            X (np.ndarray): Training data.
+            X (np.ndarray): Training data, dense or CSR.
             y (np.ndarray): Target values.
 
         Raises:
             ValueError: If the model has not been initialized.
         """
         # Ensure X and y are NumPy arrays
-        X = np.asarray(X)
-        y = np.asarray(y).ravel()
+        if not sp.issparse(X):
+            X = np.asarray(X)
+        y = np.asarray(y)
+        if y.ndim == 2 and y.shape[1] == 1:
+            y = y.ravel()
 
         if self._model is None:
             raise ValueError("Model has not been initialized.")
@@ -60,13 +72,23 @@ class DecisionTree(Model):
         self._model.fit(X, y)
         self.parameters = {"strict_parameters": deepcopy(
             self._model.get_params())}
+        self.compile()
+
+    def _estimators(self) -> List[DecisionTreeClassifier]:
+        """
+        Gets the fitted tree to export.
+
+        Returns:
+            List[DecisionTreeClassifier]: The single fitted tree.
+        """
+        return [self._model]
 
     def predict(self, X: np.ndarray) -> np.ndarray:
         """
         Predicts the target values for the provided data.
 
         Args:
-            X (np.ndarray): Input data.
+            X (np.ndarray): Input data, dense or CSR.
 
         Returns:
             np.ndarray: Predicted target values.
@@ -75,8 +97,11 @@ class DecisionTree(Model):
             ValueError: If the model has not been initialized.
         """
         # Ensure X is a NumPy array
-        X = np.asarray(X)
+        if not sp.issparse(X):
+            X = np.asarray(X)
 
+        if self._flat is not None:
+            return self._flat.predict(X)
         if self._model is None:
             raise ValueError("Model has not been initialized.")
 
@@ -0,0 +1,309 @@
+"""
+Flat-array inference for fitted scikit-learn decision trees.
+
+The nodes of every tree are laid out in contiguous arrays, with leaves
+turned into self-loops that always send a row back to themselves. All
+trees can then be traversed at once for a block of rows by repeating the
+same few array operations as many times as the deepest tree is deep,
+without any per-call validation.
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+import numpy as np
+from scipy import sparse as sp
+from sklearn.base import clone
+from sklearn.tree import DecisionTreeClassifier
+
+
+_BLOCK_NODES = 1 << 20
+
+
+class FlatForest:
+    """
+    An ensemble of decision trees flattened into contiguous NumPy arrays.
+
+    A single decision tree is a forest of one tree. Predictions average
+    the leaf class distributions of the trees, like scikit-learn does.
+
+    Attributes:
+        feature (np.ndarray): Feature tested at each node.
+        threshold (np.ndarray): Threshold of each node; rows whose value is
+            less than or equal to it go left.
+        left (np.ndarray): Index of the left child of each node.
+        right (np.ndarray): Index of the right child of each node.
+        missing_left (np.ndarray): Whether rows with a missing value at
+            each node go left, as learnt by scikit-learn.
+        value (np.ndarray): Class distribution of each node, of shape
+            (n_nodes, n_outputs, n_classes).
+        roots (np.ndarray): Index of the root node of each tree.
+        depth (int): Depth of the deepest tree.
+        classes (List[np.ndarray]): Class labels of each output.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray,
+                 left: np.ndarray, right: np.ndarray,
+                 missing_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, depth: int,
+                 classes: List[np.ndarray]) -> None:
+        """
+        Initialize the forest from its flat arrays.
+
+        Args:
+            feature (np.ndarray): Feature tested at each node.
+            threshold (np.ndarray): Threshold of each node.
+            left (np.ndarray): Index of the left child of each node.
+            right (np.ndarray): Index of the right child of each node.
+            missing_left (np.ndarray): Whether rows with a missing value
+                at each node go left.
+            value (np.ndarray): Class distribution of each node.
+            roots (np.ndarray): Index of the root node of each tree.
+            depth (int): Depth of the deepest tree.
+            classes (List[np.ndarray]): Class labels of each output.
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.classes = classes
+
+    @staticmethod
+    def from_estimators(estimators: Sequence[DecisionTreeClassifier],
+                        classes: Sequence[np.ndarray]) -> "FlatForest":
+        """
+        Export fitted scikit-learn trees into flat arrays.
+
+        Args:
+            estimators (Sequence[DecisionTreeClassifier]): The fitted trees.
+            classes (Sequence[np.ndarray]): Class labels of each output.
+
+        Returns:
+            FlatForest: The flattened ensemble.
+        """
+        features, thresholds, lefts, rights, missing, values, roots = (
+            [], [], [], [], [], [], [])
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count, dtype=np.intp)
+            leaf = tree.children_left < 0
+            features.append(np.where(leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            missing.append(np.asarray(getattr(
+                tree, "missing_go_to_left",
+                np.zeros(tree.node_count)), dtype=bool))
+            value = tree.value.astype(np.float64)
+            totals = value.sum(axis=2, keepdims=True)
+            values.append(value / np.where(totals == 0, 1, totals))
+            roots.append(offset)
+            offset += tree.node_count
+        return FlatForest(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.intp),
+            depth=max(estimator.tree_.max_depth for estimator in estimators),
+            classes=[np.asarray(labels) for labels in classes],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the memory held by the flat arrays.
+
+        Returns:
+            int: The size in bytes.
+        """
+        return sum(array.nbytes for array in (
+            self.feature, self.threshold, self.left, self.right,
+            self.missing_left, self.value, self.roots))
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Find the leaf reached by each row in each tree.
+
+        Rows are compared as float32 against the thresholds, exactly as
+        scikit-learn does, and missing values follow the direction each
+        node learnt for them.
+
+        Args:
+            X (np.ndarray): Input data of shape (n_samples, n_features).
+
+        Returns:
+            np.ndarray: Leaf indices of shape (n_samples, n_trees).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.repeat(self.roots[None, :], X.shape[0], axis=0)
+        has_missing = bool(np.isnan(X).any())
+        for _ in range(self.depth):
+            values = X[rows, self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if has_missing:
+                go_left = np.where(
+                    np.isnan(values), self.missing_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X: np.ndarray, n_jobs: int = 1) -> np.ndarray:
+        """
+        Average the leaf class distributions of the trees.
+
+        Rows are traversed in blocks that bound the number of node indices
+        held at once; with `n_jobs` above one the blocks are scored in a
+        thread pool. CSR input is densified one block at a time.
+
+        Args:
+            X (np.ndarray): Input data of shape (n_samples, n_features),
+                dense or CSR.
+            n_jobs (int): The number of threads scoring blocks.
+
+        Returns:
+            np.ndarray: Probabilities of shape
+                (n_samples, n_outputs, n_classes).
+        """
+        if sp.issparse(X):
+            X = X.tocsr()
+        else:
+            X = np.asarray(X, dtype=np.float32)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+        block_size = max(1, _BLOCK_NODES // len(self.roots))
+        blocks = [X[start:start + block_size]
+                  for start in range(0, X.shape[0], block_size)]
+        if n_jobs > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(min(n_jobs, len(blocks))) as pool:
+                results = list(pool.map(self._proba_block, blocks))
+        else:
+            results = [self._proba_block(block) for block in blocks]
+        if not results:
+            return np.empty((0,) + self.value.shape[1:])
+        return np.concatenate(results)
+
+    def predict(self, X: np.ndarray, n_jobs: int = 1) -> np.ndarray:
+        """
+        Predict the most probable class of each output.
+
+        Args:
+            X (np.ndarray): Input data of shape (n_samples, n_features),
+                dense or CSR.
+            n_jobs (int): The number of threads scoring blocks.
+
+        Returns:
+            np.ndarray: Labels of shape (n_samples,) for a single output,
+                or (n_samples, n_outputs) otherwise.
+        """
+        proba = self.predict_proba(X, n_jobs)
+        labels = [classes[np.argmax(proba[:, output, :len(classes)], axis=1)]
+                  for output, classes in enumerate(self.classes)]
+        if len(labels) == 1:
+            return labels[0]
+        return np.stack(labels, axis=1)
+
+    def _proba_block(self, block: np.ndarray) -> np.ndarray:
+        """
+        Average the leaf class distributions for one block of rows.
+
+        Args:
+            block (np.ndarray): A block of rows, dense or CSR.
+
+        Returns:
+            np.ndarray: Probabilities of shape
+                (n_block, n_outputs, n_classes).
+        """
+        if sp.issparse(block):
+            block = block.toarray()
+        leaves = self.apply(block)
+        proba = np.zeros((block.shape[0],) + self.value.shape[1:])
+        for tree in range(leaves.shape[1]):
+            proba += self.value[leaves[:, tree]]
+        if leaves.shape[1] > 1:
+            proba /= leaves.shape[1]
+        return proba
+
+
+class FlatForestMixin(ABC):
+    """
+    Flat-array inference for models wrapping scikit-learn trees.
+
+    Fitting exports the trees into flat arrays, which `predict` traverses
+    directly instead of going through scikit-learn, keeping single-row
+    predictions cheap. Once compiled, the fitted scikit-learn estimator is
+    not pickled with the model: an unfitted copy with the same parameters
+    takes its place, so saved models stay compact and can still be refit.
+
+    Models set `_model` to their scikit-learn estimator and `_flat` to
+    None, and implement `_estimators`.
+    """
+
+    _flat: Optional[FlatForest] = None
+
+    def __getstate__(self) -> dict:
+        """
+        Get the attributes to pickle, replacing the fitted estimator of a
+        compiled model by an unfitted copy.
+
+        Returns:
+            dict: The attributes of the model.
+        """
+        state = self.__dict__.copy()
+        if self._flat is not None and self._model is not None:
+            state["_model"] = clone(self._model)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restore a pickled model, compiling models pickled before flat
+        inference existed.
+
+        Args:
+            state (dict): The pickled attributes of the model.
+        """
+        self.__dict__.update(state)
+        if "_flat" not in state and hasattr(self._model, "classes_"):
+            self.compile()
+
+    def compile(self, drop_estimator: bool = False) -> FlatForest:
+        """
+        Export the fitted trees into flat arrays used by `predict`.
+
+        Args:
+            drop_estimator (bool): Whether to discard the scikit-learn
+                estimator afterwards, so it is not pickled with the model.
+
+        Returns:
+            FlatForest: The exported trees.
+
+        Raises:
+            ValueError: If the model has not been fitted.
+        """
+        if not hasattr(self._model, "classes_"):
+            if self._flat is None:
+                raise ValueError("Model has not been fitted.")
+            return self._flat
+        classes = (self._model.classes_ if self._model.n_outputs_ > 1
+                   else [self._model.classes_])
+        self._flat = FlatForest.from_estimators(self._estimators(), classes)
+        if drop_estimator:
+            self._model = None
+        return self._flat
+
+    @abstractmethod
+    def _estimators(self) -> Sequence[DecisionTreeClassifier]:
+        """
+        Get the fitted scikit-learn trees of the model.
+
+        Returns:
+            Sequence[DecisionTreeClassifier]: The trees to export.
+        """
+        pass
@@ -1,29 +1,51 @@
 from autoop.core.ml.model.model import Model
+from autoop.core.ml.model.classification.flat_tree import FlatForestMixin
+from autoop.core.ml.parallel import get_cpu_budget
 import numpy as np
+from scipy import sparse as sp
 # from typing import Any  # Unused import removed
+from contextlib import contextmanager
 from copy import deepcopy
+from typing import Iterator, List
+from joblib import parallel_config
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
 
 
-class RandomForest(Model):
+class RandomForest(FlatForestMixin, Model):
     """
     RandomForest model for classification tasks.
 
+    Trees are built and queried in parallel, either by `n_jobs` threads,
+    which suffices since scikit-learn releases the GIL while growing a
+    tree, or by `n_processes` worker processes, which take precedence when
+    set above one. Workers are reserved from the process-wide CPU budget
+    for the duration of each fit or predict call.
+
+    Predictions go through the flat arrays of `FlatForestMixin`.
+
     Attributes:
         n_trees (int): Number of trees in the forest.
         max_depth (int): Maximum depth of the tree.
         min_samples_split (int): Minimum number of samples required to
                                  split an internal node.
+        n_jobs (int): Number of threads, -1 meaning the whole CPU budget.
+        n_processes (int): Number of worker processes, -1 meaning the
+                           whole CPU budget.
         name (str): Name of the model.
         type (str): Type of the model.
         _hyperparameters (dict): Hyperparameters for the
                                  RandomForestClassifier.
         _model (RandomForestClassifier): The RandomForestClassifier
                                          instance.
+        _flat (FlatForest): The fitted trees as flat arrays.
     """
 
+    supports_sparse = True
+
     def __init__(self, n_trees: int = 100, max_depth: int = None,
-                 min_samples_split: int = 2, name: str = "Random Forest",
+                 min_samples_split: int = 2, n_jobs: int = 1,
+                 n_processes: int = 1, name: str = "Random Forest",
                  type: str = "classification") -> None:
         """
         Initializes the RandomForest model with given hyperparameters.
@@ -33,6 +55,9 @@ class RandomForest(Model):
             max_depth (int): Maximum depth of the tree.
             min_samples_split (int): Minimum number of samples required to
                                      split an internal node.
+            n_jobs (int): Number of threads used to fit and predict.
+            n_processes (int): Number of worker processes used to fit and
+                               predict instead of threads.
             name (str): Name of the model.
             type (str): Type of the model.
         """
@@ -40,42 +65,69 @@ class RandomForest(Model):
         self.n_trees = n_trees
         self.max_depth = max_depth
         self.min_samples_split = min_samples_split
+        self.n_jobs = n_jobs
+        self.n_processes = n_processes
         self._parameters = {
             "n_estimators": self.n_trees,
             "max_depth": self.max_depth,
             "min_samples_split": self.min_samples_split,
         }
         self._model = RandomForestClassifier(**self._parameters)
+        self._flat = None
 
     def fit(self, X: np.ndarray, y: np.ndarray) -> None:
         """
         Fits the RandomForest model to the provided data.
 
         Args:
-            X (np.ndarray): Training data.
+            X (np.ndarray): Training data, dense or CSR.
             y (np.ndarray): Target values.
 
         Raises:
             ValueError: If the model has not been initialized.
         """
-        X = np.asarray(X)
+        if not sp.issparse(X):
+            X = np.asarray(X)
         y = np.asarray(y)
         if self._model is None:
             raise ValueError(
                 "Model has not been initialized. Call `initialize_model()` "
                 "first."
             )
-        self._model.fit(X, y)
+        with self._parallel():
+            self._model.fit(X, y)
         self.parameters = {
             "strict_parameters": deepcopy(self._model.get_params())
         }
+        self.compile()
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restores a pickled model, defaulting the parallelism settings of
+        models pickled before they existed.
+
+        Args:
+            state (dict): The pickled attributes of the model.
+        """
+        state.setdefault("n_jobs", 1)
+        state.setdefault("n_processes", 1)
+        super().__setstate__(state)
+
+    def _estimators(self) -> List[DecisionTreeClassifier]:
+        """
+        Gets the fitted trees to export.
+
+        Returns:
+            List[DecisionTreeClassifier]: The trees of the forest.
+        """
+        return self._model.estimators_
 
     def predict(self, X: np.ndarray) -> np.ndarray:
         """
         Predicts the target values for the provided data.
 
         Args:
-            X (np.ndarray): Input data.
+            X (np.ndarray): Input data, dense or CSR.
 
         Returns:
             np.ndarray: Predicted target values.
@@ -83,11 +135,35 @@ class RandomForest(Model):
         Raises:
             ValueError: If the model has not been initialized.
         """
-        X = np.asarray(X)
+        if not sp.issparse(X):
+            X = np.asarray(X)
+        if self._flat is not None:
+            with get_cpu_budget().reserve(self.n_jobs) as n_jobs:
+                return self._flat.predict(X, n_jobs)
         if self._model is None:
             raise ValueError(
                 "Model has not been initialized. Call `initialize_model()` "
                 "first."
             )
 
-        return self._model.predict(X)
+        with self._parallel():
+            return self._model.predict(X)
+
+    @contextmanager
+    def _parallel(self) -> Iterator[int]:
+        """
+        Reserve workers from the CPU budget and hand them to the forest.
+
+        Yields:
+            int: The number of workers granted.
+        """
+        use_processes = self.n_processes not in (None, 0, 1)
+        requested = self.n_processes if use_processes else self.n_jobs
+        backend = "loky" if use_processes else "threading"
+        with get_cpu_budget().reserve(requested) as n_workers:
+            self._model.set_params(n_jobs=n_workers)
+            try:
+                with parallel_config(backend=backend, n_jobs=n_workers):
+                    yield n_workers
+            finally:
+                self._model.set_params(n_jobs=None)
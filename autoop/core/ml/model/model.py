@@ -13,8 +13,12 @@ class Model(ABC, Artifact):
         type: The type of the model.
         _hyperparameters: The hyperparameters for the model.
         parameters: The parameters of the model after fitting.
+        supports_sparse: Whether `fit` and `predict` accept SciPy CSR
+            matrices. Other models are given dense arrays.
     """
 
+    supports_sparse = False
+
     def __init__(self, name: str, type: str) -> None:
         """
         Initialize the model with given hyperparameters.
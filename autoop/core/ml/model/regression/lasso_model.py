@@ -1,15 +1,24 @@
 from autoop.core.ml.model.model import Model
+from autoop.core.ml.metric import Metric, MeanSquaredError
 import numpy as np
-from sklearn.linear_model import Lasso as SklearnLasso
+from scipy import sparse as sp
+from sklearn.linear_model import Lasso as SklearnLasso, lasso_path
 from copy import deepcopy
+from typing import List, Optional, Tuple
 
 
 class Lasso(Model):
     """
     A wrapper around the Lasso regression model from scikit-learn.
     This model is used for linear regression with L1 regularization.
+
+    `fit_path` fits a whole descending sequence of alphas in one call,
+    warm-starting each fit from the previous solution and sharing one
+    Gram matrix across the path.
     """
 
+    supports_sparse = True
+
     def __init__(
             self, alpha: float = 1.0,
             name: str = "Lasso", type: str = "regression") -> None:
@@ -54,7 +63,7 @@ class Lasso(Model):
         """
         Fit the Lasso model to the given data.
 
-        :param observations: Training data.
+        :param observations: Training data, dense or CSR.
         :param ground_truth: Target values.
         :raises ValueError: If the model has not been initialized.
         """
@@ -76,3 +85,84 @@ class Lasso(Model):
         if self._model is None or not hasattr(self._model, "coef_"):
             raise ValueError("Model has not been fitted yet.")
         return self._model.predict(observations)
+
+    def fit_path(
+            self, observations: np.ndarray, ground_truth: np.ndarray,
+            alphas: Optional[np.ndarray] = None, n_alphas: int = 100,
+            eps: float = 1e-3,
+            validation: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+            metrics: Optional[List[Metric]] = None) -> dict:
+        """
+        Fit the Lasso along a regularization path with warm starts.
+
+        The data is centred once and its Gram matrix computed once; every
+        alpha is then solved by coordinate descent on that Gram matrix,
+        starting from the coefficients of the previous alpha. With
+        validation data the model is left fitted at the alpha with the
+        lowest validation mean squared error.
+
+        :param observations: Training data.
+        :param ground_truth: Target values, one per sample.
+        :param alphas: The alphas to fit, in any order. Defaults to
+            `n_alphas` values spaced on a log scale from the smallest
+            alpha that zeroes every coefficient down to `eps` times it.
+        :param n_alphas: The number of alphas when none are given.
+        :param eps: The ratio of the smallest to the largest default alpha.
+        :param validation: Optional (observations, ground_truth) held-out
+            data to score every alpha on.
+        :param metrics: The metrics to score every alpha with. Defaults
+            to the mean squared error.
+        :return: A dictionary with the descending "alphas", the "coefs" of
+            shape (n_alphas, n_features), the "intercepts", the validation
+            "metrics" by metric class name and the "best_index", which is
+            None without validation data.
+        """
+        if sp.issparse(observations):
+            observations = observations.toarray()
+        observations = np.asarray(observations, dtype=np.float64)
+        ground_truth = np.asarray(ground_truth, dtype=np.float64).ravel()
+        observations_mean = observations.mean(axis=0)
+        ground_truth_mean = ground_truth.mean()
+        centred = observations - observations_mean
+        target = ground_truth - ground_truth_mean
+        moment = centred.T @ target
+        if alphas is None:
+            alpha_max = max(np.abs(moment).max() / len(target),
+                            np.finfo(np.float64).tiny)
+            alphas = np.geomspace(alpha_max, alpha_max * eps, n_alphas)
+        alphas = np.sort(np.asarray(alphas, dtype=np.float64))[::-1]
+        path_alphas, coefs, _ = lasso_path(
+            centred, target, alphas=alphas, precompute=centred.T @ centred,
+            Xy=moment, max_iter=self._model.max_iter, tol=self._model.tol)
+        coefs = coefs.T
+        intercepts = ground_truth_mean - coefs @ observations_mean
+        results = {
+            "alphas": path_alphas,
+            "coefs": coefs,
+            "intercepts": intercepts,
+            "metrics": {},
+            "best_index": None,
+        }
+        if validation is None:
+            return results
+
+        validation_X = validation[0]
+        if sp.issparse(validation_X):
+            validation_X = validation_X.toarray()
+        validation_X = np.asarray(validation_X, dtype=np.float64)
+        validation_y = np.asarray(validation[1], dtype=np.float64).ravel()
+        predictions = validation_X @ coefs.T + intercepts
+        for metric in metrics or [MeanSquaredError()]:
+            results["metrics"][metric.__class__.__name__] = [
+                metric.evaluate(predictions[:, index], validation_y)
+                for index in range(len(path_alphas))
+            ]
+        errors = np.mean((predictions - validation_y[:, None]) ** 2, axis=0)
+        best = int(np.argmin(errors))
+        results["best_index"] = best
+
+        self._model.set_params(alpha=path_alphas[best], warm_start=True)
+        self._model.coef_ = coefs[best].copy()
+        self.fit(observations, ground_truth)
+        self._model.set_params(warm_start=False)
+        return results
@@ -0,0 +1,310 @@
+"""
+Least squares solvers shared by the linear regression models.
+
+The intercept is never materialised as a column of ones: the normal
+equations are augmented with the column sums instead, and the QR and
+`lstsq` solvers work on centred data. `NormalEquations` accumulates the
+sufficient statistics chunk by chunk for data that does not fit in memory.
+
+float32 data keeps its BLAS products in float32, a block of rows at a
+time, while the normal equations are accumulated and solved in float64.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional, Tuple
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+
+
+SOLVERS = ["auto", "cholesky", "qr", "lstsq"]
+_MAX_GRAM_CONDITION = 1e10
+_ACCUMULATION_ROWS = 1 << 16
+
+
+def normal_equations(
+        observations: np.ndarray,
+        ground_truth: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the normal equations of a linear model with an intercept.
+
+    The products are computed in the dtype of the data and accumulated in
+    float64, in blocks of rows when the data is float32.
+
+    Args:
+        observations (np.ndarray): Data of shape (n_samples, n_features).
+        ground_truth (np.ndarray): Targets of shape (n_samples, ...).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The augmented Gram matrix of shape
+            (n_features + 1, n_features + 1) and the right-hand side of
+            shape (n_features + 1, ...), the intercept coming last.
+    """
+    n_samples, n_features = observations.shape
+    gram = np.zeros((n_features + 1, n_features + 1))
+    moment = np.zeros((n_features + 1,) + ground_truth.shape[1:])
+    block_size = n_samples
+    if observations.dtype.itemsize < 8:
+        block_size = _ACCUMULATION_ROWS
+    for start in range(0, n_samples, max(block_size, 1)):
+        block = observations[start:start + block_size]
+        target = ground_truth[start:start + block_size]
+        gram[:n_features, :n_features] += block.T @ block
+        moment[:n_features] += block.T @ target
+    sums = observations.sum(axis=0, dtype=np.float64)
+    gram[:n_features, n_features] = sums
+    gram[n_features, :n_features] = sums
+    gram[n_features, n_features] = n_samples
+    moment[n_features] = ground_truth.sum(axis=0, dtype=np.float64)
+    return gram, moment
+
+
+def _cholesky_solve(gram: np.ndarray,
+                    moment: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Solve normal equations by Cholesky if they are well-conditioned.
+
+    The condition number is estimated from the diagonal of the Cholesky
+    factor.
+
+    Args:
+        gram (np.ndarray): The Gram matrix.
+        moment (np.ndarray): The right-hand side.
+
+    Returns:
+        Optional[np.ndarray]: The solution, or None if the Gram matrix is
+            singular or ill-conditioned.
+    """
+    try:
+        factor = cho_factor(gram)
+    except np.linalg.LinAlgError:
+        return None
+    diagonal = np.abs(np.diag(factor[0]))
+    if (diagonal.max() / diagonal.min()) ** 2 >= _MAX_GRAM_CONDITION:
+        return None
+    return cho_solve(factor, moment)
+
+
+def solve_normal_equations(gram: np.ndarray,
+                           moment: np.ndarray) -> np.ndarray:
+    """
+    Solve normal equations by Cholesky, or by `lstsq` when ill-conditioned.
+
+    Singular systems, such as one-hot columns next to an intercept, get
+    the minimum-norm solution.
+
+    Args:
+        gram (np.ndarray): The Gram matrix.
+        moment (np.ndarray): The right-hand side.
+
+    Returns:
+        np.ndarray: The solution vector, intercept last.
+    """
+    theta = _cholesky_solve(gram, moment)
+    if theta is None:
+        theta = np.linalg.lstsq(gram, moment, rcond=None)[0]
+    return theta
+
+
+def fit_least_squares(observations: np.ndarray, ground_truth: np.ndarray,
+                      solver: str = "auto") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fit the weights and intercept of a linear model.
+
+    With "auto", tall problems are solved through Cholesky on the normal
+    equations, which only costs one pass over the data. Problems with
+    fewer samples than coefficients, or whose Gram matrix turns out to be
+    ill-conditioned, are solved with `lstsq` on the centred data instead;
+    those solvers always work in float64.
+
+    Args:
+        observations (np.ndarray): Data of shape (n_samples, n_features).
+        ground_truth (np.ndarray): Targets of shape (n_samples, ...).
+        solver (str): One of "auto", "cholesky", "qr" or "lstsq".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The weights of shape
+            (n_features, ...) and the intercept of shape (...).
+
+    Raises:
+        ValueError: If the solver is not supported.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(
+            f"Unsupported solver: {solver}. Supported solvers are: "
+            f"{SOLVERS}"
+        )
+    n_samples, n_features = observations.shape
+    if solver == "cholesky":
+        theta = solve_normal_equations(
+            *normal_equations(observations, ground_truth))
+        return theta[:n_features], theta[n_features]
+    if solver == "auto" and n_samples > n_features:
+        theta = _cholesky_solve(
+            *normal_equations(observations, ground_truth))
+        if theta is not None:
+            return theta[:n_features], theta[n_features]
+
+    observations = observations.astype(np.float64, copy=False)
+    ground_truth = ground_truth.astype(np.float64, copy=False)
+    observations_mean = observations.mean(axis=0)
+    ground_truth_mean = ground_truth.mean(axis=0)
+    centred = observations - observations_mean
+    target = ground_truth - ground_truth_mean
+    weights = None
+    if solver == "qr":
+        q, r = np.linalg.qr(centred)
+        diagonal = np.abs(np.diag(r))
+        tolerance = np.finfo(r.dtype).eps * max(r.shape) * diagonal.max()
+        if diagonal.size and np.all(diagonal > tolerance):
+            weights = solve_triangular(r, q.T @ target)
+    if weights is None:
+        weights = np.linalg.lstsq(centred, target, rcond=None)[0]
+    return weights, ground_truth_mean - observations_mean @ weights
+
+
+def predict_linear(observations: np.ndarray, weights: np.ndarray,
+                   bias: np.ndarray) -> np.ndarray:
+    """
+    Predict with a linear model in the dtype of the data.
+
+    float32 data is multiplied with float32 weights instead of being
+    upcast to float64.
+
+    Args:
+        observations (np.ndarray): Data of shape (n_samples, n_features).
+        weights (np.ndarray): The weights of shape (n_features, ...).
+        bias (np.ndarray): The intercept of shape (...).
+
+    Returns:
+        np.ndarray: The predictions of shape (n_samples, ...).
+    """
+    if observations.dtype == np.float32:
+        weights = weights.astype(np.float32)
+        bias = np.asarray(bias, dtype=np.float32)
+    return observations @ weights + bias
+
+
+class NormalEquations:
+    """
+    Normal equations of a linear model, accumulated over chunks of data.
+
+    Only the Gram matrix, the right-hand side and the sample count are
+    kept, so memory does not depend on the number of samples.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize empty statistics.
+        """
+        self.gram = None
+        self.moment = None
+        self.n_samples = 0
+
+    def update(self, observations: np.ndarray,
+               ground_truth: np.ndarray) -> None:
+        """
+        Add a chunk of data to the statistics.
+
+        Args:
+            observations (np.ndarray): Chunk of shape (n_chunk, n_features).
+            ground_truth (np.ndarray): Targets of shape (n_chunk, ...).
+        """
+        gram, moment = normal_equations(observations, ground_truth)
+        if self.gram is None:
+            self.gram, self.moment = gram, moment
+        else:
+            self.gram += gram
+            self.moment += moment
+        self.n_samples += observations.shape[0]
+
+    def solve(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Solve the accumulated normal equations.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The weights and the intercept.
+
+        Raises:
+            ValueError: If no data has been accumulated.
+        """
+        if self.gram is None:
+            raise ValueError("No data has been accumulated.")
+        theta = solve_normal_equations(self.gram, self.moment)
+        return theta[:-1], theta[-1]
+
+
+class StreamingLeastSquaresMixin(ABC):
+    """
+    Out-of-core training for linear models solved by least squares.
+
+    Only X^T X, X^T y and the sample count are accumulated over chunks of
+    data, so memory does not depend on the number of samples. Models
+    reset `_statistics` to None when fitted in one go and implement
+    `_prepare_chunk` and `_set_solution`.
+    """
+
+    _statistics: Optional[NormalEquations] = None
+
+    def partial_fit(self, observations: np.ndarray,
+                    ground_truth: np.ndarray) -> None:
+        """
+        Update the model with one more chunk of training data.
+
+        The chunk is folded into the accumulated normal equations, which
+        are then re-solved. Each call costs O(n_chunk d^2 + d^3) for d
+        features, whatever the number of samples seen so far; use
+        `fit_stream` to solve only once.
+
+        Args:
+            observations (np.ndarray): Chunk of shape (n_chunk, n_features).
+            ground_truth (np.ndarray): Targets of the chunk.
+        """
+        if self._statistics is None:
+            self._statistics = NormalEquations()
+        self._statistics.update(
+            *self._prepare_chunk(observations, ground_truth))
+        self._set_solution(*self._statistics.solve())
+
+    def fit_stream(
+            self, chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> None:
+        """
+        Train the model on chunks of data, solving once at the end.
+
+        Args:
+            chunks (Iterable[Tuple[np.ndarray, np.ndarray]]): The
+                (observations, ground_truth) chunks, for example from
+                `feature_chunks` over `Dataset.read_chunks`.
+        """
+        self._statistics = NormalEquations()
+        for observations, ground_truth in chunks:
+            self._statistics.update(
+                *self._prepare_chunk(observations, ground_truth))
+        self._set_solution(*self._statistics.solve())
+
+    @abstractmethod
+    def _prepare_chunk(
+            self, observations: np.ndarray,
+            ground_truth: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Validate a chunk and shape it like the data given to `fit`.
+
+        Args:
+            observations (np.ndarray): The chunk of input data.
+            ground_truth (np.ndarray): The targets of the chunk.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The chunk as 2D observations
+                and targets.
+        """
+        pass
+
+    @abstractmethod
+    def _set_solution(self, weights: np.ndarray, bias: np.ndarray) -> None:
+        """
+        Store solved weights and intercept in the model.
+
+        Args:
+            weights (np.ndarray): The weights.
+            bias (np.ndarray): The intercept.
+        """
+        pass
@@ -1,41 +1,79 @@
 import numpy as np
 from autoop.core.ml.model.model import Model
+from autoop.core.ml.model.regression.least_squares import (
+    StreamingLeastSquaresMixin, fit_least_squares, predict_linear)
 from copy import deepcopy
+from typing import Tuple
 
 
-class LinearRegression(Model):
+class LinearRegression(StreamingLeastSquaresMixin, Model):
     """
     A simple linear regression model using basic matrix operations.
+
+    Besides `fit`, the model can be trained out of core through
+    `StreamingLeastSquaresMixin`.
     """
 
     def __init__(self,
+                 solver: str = "auto",
                  name: str = "Simple Linear Regression",
                  type: str = "regression") -> None:
         """
         Initialize the Simple Linear Regression model.
+
+        Args:
+            solver (str): The least squares solver, one of "auto",
+                "cholesky", "qr" or "lstsq".
         """
         super().__init__(name=name, type=type)
+        self.solver = solver
         self.weights = None
         self.bias = None
+        self._statistics = None
 
     def fit(self, X: np.ndarray, y: np.ndarray) -> None:
         """
-        Train the linear regression model using the normal equation.
+        Train the linear regression model using least squares.
 
         Args:
             X (np.ndarray): Training data of shape (n_samples, n_features).
             y (np.ndarray): Target values of shape (n_samples,).
         """
-        y = y.flatten()
+        X = np.asarray(X)
+        y = np.asarray(y).flatten()
         if X.ndim == 1:
             X = X.reshape(-1, 1)
 
-        X_b = np.hstack([np.ones((X.shape[0], 1)), X])
+        self.weights, self.bias = fit_least_squares(X, y, self.solver)
+        self._statistics = None
+
+    def _prepare_chunk(
+            self, X: np.ndarray,
+            y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Shape a chunk of training data like `fit` does.
 
-        theta = np.linalg.pinv(X_b.T @ X_b) @ X_b.T @ y
+        Args:
+            X (np.ndarray): Chunk of shape (n_chunk, n_features).
+            y (np.ndarray): Target values of shape (n_chunk,).
 
-        self.bias = theta[0]
-        self.weights = theta[1:]
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The 2D chunk and flat targets.
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(-1, 1)
+        return X, np.asarray(y).flatten()
+
+    def _set_solution(self, weights: np.ndarray, bias: np.ndarray) -> None:
+        """
+        Store solved weights and bias.
+
+        Args:
+            weights (np.ndarray): The weights.
+            bias (np.ndarray): The bias.
+        """
+        self.weights, self.bias = weights, bias
 
     def predict(self, X: np.ndarray) -> np.ndarray:
         """
@@ -50,10 +88,11 @@ class LinearRegression(Model):
         if self.weights is None or self.bias is None:
             raise ValueError("Model has not been fitted yet.")
 
+        X = np.asarray(X)
         if X.ndim == 1:
             X = X.reshape(-1, 1)
 
-        return X @ self.weights + self.bias
+        return predict_linear(X, self.weights, self.bias)
 
     @property
     def parameters(self) -> dict:
@@ -1,8 +1,11 @@
 from autoop.core.ml.model.model import Model
+from autoop.core.ml.model.regression.least_squares import (
+    StreamingLeastSquaresMixin, fit_least_squares, predict_linear)
+from typing import Tuple
 import numpy as np
 
 
-class MultipleLinearRegression(Model):
+class MultipleLinearRegression(StreamingLeastSquaresMixin, Model):
     """
     A class used to represent a Multiple Linear Regression model.
 
@@ -12,9 +15,13 @@ class MultipleLinearRegression(Model):
         The type of the model, which is 'regression'.
     parameters : dict
         A dictionary to store the model parameters.
+
+    Besides `fit`, the model can be trained out of core through
+    `StreamingLeastSquaresMixin`.
     """
 
-    def __init__(self, name: str = "Multiple Linear Regression",
+    def __init__(self, solver: str = "auto",
+                 name: str = "Multiple Linear Regression",
                  type: str = "regression") -> None:
         """
         Initialize the MultipleLinearRegression
@@ -22,11 +29,14 @@ class MultipleLinearRegression(Model):
 
         Parameters
         ----------
-        hyperparameters : dict
-            Hyperparameters for the LinearRegression model.
+        solver : str
+            The least squares solver, one of "auto", "cholesky", "qr" or
+            "lstsq". "auto" picks one by shape and conditioning.
         """
         super().__init__(name=name, type=type)
         self.type = "regression"
+        self.solver = solver
+        self._statistics = None
         self.parameters = {}
         self.weights = None
         self.bias = None
@@ -48,8 +58,8 @@ class MultipleLinearRegression(Model):
             self, observations: np.ndarray, ground_truth: np.ndarray) -> None:
         """
         Train the model by solving for the
-          weight vector w using the closed-form
-        solution for multiple linear regression.
+          weight vector w using the least squares
+        solver selected at construction.
 
         Parameters
         ----------
@@ -71,15 +81,52 @@ class MultipleLinearRegression(Model):
         if ground_truth.size == 0 or observations.size == 0:
             raise ValueError("Input arrays cannot be empty.")
 
-        data_points = observations.shape[0]
-        ones_column = np.ones((data_points, 1))
-        x_wave = np.hstack([observations, ones_column])
-        x_wave_transpose = x_wave.T
-        w_wave = np.linalg.pinv(x_wave_transpose.dot(x_wave))
-        w_wave_star = w_wave.dot(x_wave_transpose).dot(ground_truth)
+        weights, biases = fit_least_squares(
+            np.asarray(observations), np.asarray(ground_truth), self.solver)
+
+        self._set_solution(weights, biases)
+        self._statistics = None
+
+    def _prepare_chunk(
+            self, observations: np.ndarray,
+            ground_truth: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Validate a chunk of training data.
+
+        Parameters
+        ----------
+        observations : np.ndarray
+            A 2D chunk of input data.
+        ground_truth : np.ndarray
+            The target values of the chunk.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The chunk as arrays.
+
+        Raises
+        ------
+        ValueError
+            If the dimensions of observations and ground_truth do not match.
+        """
+        if observations.shape[0] != ground_truth.shape[0]:
+            raise ValueError("Observations must match ground truth")
+        return np.asarray(observations), np.asarray(ground_truth)
+
+    def _set_solution(self, weights: np.ndarray, biases: np.ndarray) -> None:
+        """
+        Store solved weights and biases in the parameters.
 
-        self.parameters['weights'] = w_wave_star[:-1]
-        self.parameters['biases'] = w_wave_star[-1]
+        Parameters
+        ----------
+        weights : np.ndarray
+            The weights.
+        biases : np.ndarray
+            The biases.
+        """
+        self.parameters['weights'] = weights
+        self.parameters['biases'] = biases
 
     def predict(self, observation: np.ndarray) -> np.ndarray:
         """
@@ -102,5 +149,6 @@ class MultipleLinearRegression(Model):
         """
         if 'weights'not in self.parameters or 'biases' not in self.parameters:
             raise ValueError("Model has not been fitted yet.")
-        y_hat = observation.dot(self.parameters['weights'])
-        return y_hat + self.parameters['biases']
+        return predict_linear(np.asarray(observation),
+                              self.parameters['weights'],
+                              self.parameters['biases'])
@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import os
+import threading
+
+
+def _default_total() -> int:
+    """
+    Read the default CPU budget from the environment.
+
+    Returns:
+        int: The AUTOOP_CPU_BUDGET variable, or the number of CPUs.
+    """
+    return int(os.environ.get("AUTOOP_CPU_BUDGET", os.cpu_count() or 1))
+
+
+class CPUBudget:
+    """
+    A process-wide budget of CPUs shared by concurrently running models.
+
+    Every parallel section reserves the workers it wants and gets at most
+    what is still free, but never less than one, so that work always
+    progresses without oversubscribing the machine.
+    """
+
+    def __init__(self, total: Optional[int] = None) -> None:
+        """
+        Initialize the budget.
+
+        Args:
+            total (Optional[int]): The number of CPUs to share. Defaults
+                to the AUTOOP_CPU_BUDGET environment variable, or the
+                number of CPUs of the machine.
+        """
+        self._total = total or _default_total()
+        self._in_use = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        """
+        Get the number of CPUs shared through the budget.
+
+        Returns:
+            int: The total budget.
+        """
+        return self._total
+
+    @total.setter
+    def total(self, total: int) -> None:
+        """
+        Set the number of CPUs shared through the budget.
+
+        Args:
+            total (int): The new total budget.
+        """
+        with self._lock:
+            self._total = max(1, total)
+
+    @property
+    def available(self) -> int:
+        """
+        Get the number of CPUs that are not reserved.
+
+        Returns:
+            int: The free part of the budget.
+        """
+        return max(0, self._total - self._in_use)
+
+    def resolve(self, n_jobs: Optional[int]) -> int:
+        """
+        Turn an n_jobs setting into a number of workers.
+
+        Args:
+            n_jobs (Optional[int]): The requested workers; -1 asks for the
+                whole budget and None for a single worker.
+
+        Returns:
+            int: The requested number of workers, at least one.
+        """
+        if n_jobs == -1:
+            return self._total
+        return max(1, n_jobs or 1)
+
+    @contextmanager
+    def reserve(self, n_jobs: Optional[int]) -> Iterator[int]:
+        """
+        Reserve workers for the duration of a block.
+
+        Args:
+            n_jobs (Optional[int]): The requested workers, as accepted by
+                `resolve`.
+
+        Yields:
+            int: The number of workers granted.
+        """
+        requested = self.resolve(n_jobs)
+        with self._lock:
+            granted = max(1, min(requested, self._total - self._in_use))
+            self._in_use += granted
+        try:
+            yield granted
+        finally:
+            with self._lock:
+                self._in_use -= granted
+
+
+_budget = CPUBudget()
+
+
+def get_cpu_budget() -> CPUBudget:
+    """
+    Get the process-wide CPU budget.
+
+    Returns:
+        CPUBudget: The shared budget.
+    """
+    return _budget
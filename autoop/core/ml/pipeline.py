@@ -1,19 +1,49 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union
 import pickle
 
 from autoop.core.ml.artifact import Artifact
+from autoop.core.ml.cache import get_cache
 from autoop.core.ml.dataset import Dataset
 from autoop.core.ml.model import Model
 from autoop.core.ml.feature import Feature
-from autoop.core.ml.metric import Metric
-from autoop.functional.preprocessing import preprocess_features
+from autoop.core.ml.metric import Metric, evaluate_metrics
+from autoop.functional.preprocessing import (
+    build_feature_matrix, fit_feature, inverse_transform_feature, row_slice)
 import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+
+
+_TRANSIENT_ATTRIBUTES = [
+    "_dataset", "_data", "_train_rows", "_test_rows",
+    "_train_X", "_test_X", "_train_y", "_test_y", "_predictions",
+]
+DTYPES = ["float32", "float64"]
 
 
 class Pipeline:
     """
     A class used to represent a Machine Learning Pipeline.
 
+    Once executed, the pipeline holds the fitted state of every feature
+    transform, so `transform` and `predict` serve new data without
+    refitting or reading the dataset. Pickling drops the dataset and the
+    intermediate arrays, keeping saved pipelines compact.
+
+    The rows are split first and the feature transforms are fitted on the
+    training rows only. All rows are then transformed into one
+    preallocated feature matrix, training rows first, of which the
+    training and testing sets are zero-copy row slices. The split and the
+    matrices are cached by dataset digest, split, seed, features and
+    dtype, so running the same configuration with another model skips
+    preprocessing entirely. The cached input matrix is CSR when one-hot
+    encodings exist and is densified once for models without sparse
+    support.
+
+    The matrices are stored in the compute dtype of the pipeline. float32
+    halves their memory and speeds up distance and linear algebra
+    kernels, while metrics are still accumulated in float64.
+
     Attributes
     ----------
     metrics : List[Metric]
@@ -28,6 +58,12 @@ class Pipeline:
         The target feature.
     split : float
         The ratio to split the dataset into training and testing sets.
+    seed : Optional[int]
+        The seed of the row shuffle before splitting, or None to split
+        by position.
+    dtype : str
+        The compute dtype of the feature matrices, "float32" or
+        "float64".
     """
 
     def __init__(self,
@@ -36,7 +72,9 @@ class Pipeline:
                  model: Model,
                  input_features: List[Feature],
                  target_feature: Feature,
-                 split: float = 0.8) -> None:
+                 split: float = 0.8,
+                 seed: Optional[int] = None,
+                 dtype: str = "float64") -> None:
         """
         Parameters
         ----------
@@ -53,7 +91,24 @@ class Pipeline:
         split : float, optional
             The ratio to split the dataset into training and testing sets
             (default is 0.8).
+        seed : Optional[int], optional
+            The seed of the row shuffle before splitting, or None to keep
+            the first rows for training (default is None).
+        dtype : str, optional
+            The compute dtype of the feature matrices, "float32" or
+            "float64" (default is "float64").
+
+        Raises
+        ------
+        ValueError
+            If the dtype is not supported, or the model type does not
+            match the target feature.
         """
+        if dtype not in DTYPES:
+            raise ValueError(
+                f"Unsupported dtype: {dtype}. Supported dtypes are: "
+                f"{DTYPES}"
+            )
         self._dataset = dataset
         self._model = model
         self._input_features = input_features
@@ -61,6 +116,11 @@ class Pipeline:
         self._metrics = metrics
         self._artifacts = {}
         self._split = split
+        self._seed = seed
+        self._dtype = dtype
+        self._data = None
+        self._train_rows = None
+        self._test_rows = None
         if target_feature.type == "categorical":
             if model.type != "classification":
                 raise ValueError(
@@ -84,6 +144,8 @@ Pipeline(
     input_features={list(map(str, self._input_features))},
     target_feature={str(self._target_feature)},
     split={self._split},
+    seed={self._seed},
+    dtype={self._dtype},
     metrics={list(map(str, self._metrics))},
 )
 """
@@ -103,27 +165,94 @@ Pipeline(
         """
         artifacts = []
         for name, artifact in self._artifacts.items():
-            artifact_type = artifact.get("type")
-            if artifact_type in ["OneHotEncoder"]:
-                data = artifact["encoder"]
-                data = pickle.dumps(data)
-                artifacts.append(Artifact(name=name, data=data))
-            if artifact_type in ["StandardScaler"]:
-                data = artifact["scaler"]
-                data = pickle.dumps(data)
-                artifacts.append(Artifact(name=name, data=data))
+            # The whole fitted transform, so it can be applied on its own.
+            if artifact.get("type") in ["OneHotEncoder", "StandardScaler"]:
+                data = pickle.dumps(artifact)
+                artifacts.append(
+                    Artifact(name=name, type=artifact["type"], data=data))
         pipeline_data = {
             "input_features": self._input_features,
             "target_feature": self._target_feature,
             "split": self._split,
         }
         artifacts.append(Artifact(name="pipeline_config",
+                                  type="pipeline_config",
                                   data=pickle.dumps(pipeline_data)))
-        artifacts.append(
-            self._model.to_artifact(name=f"pipeline_model_{self._model.type}")
-        )
+        artifacts.append(Artifact(
+            name=f"pipeline_model_{self._model.type}", type="model",
+            data=pickle.dumps(self._model)))
         return artifacts
 
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Returns the state to pickle, without the dataset and the
+        intermediate arrays of the last execution.
+        """
+        state = self.__dict__.copy()
+        for name in _TRANSIENT_ATTRIBUTES:
+            if name in state:
+                state[name] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """
+        Restores a pickled pipeline, defaulting the settings that older
+        pickles do not hold.
+        """
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_seed", None)
+        self.__dict__.setdefault("_dtype", "float64")
+
+    def transform(self, data: pd.DataFrame) -> np.array:
+        """
+        Transforms raw input data with the fitted feature transforms.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The raw data, holding a column per input feature.
+
+        Returns
+        -------
+        np.array
+            The model input, a CSR matrix for models that support sparse
+            input.
+
+        Raises
+        ------
+        ValueError
+            If the pipeline has not been fitted or columns are missing.
+        """
+        missing = [feature.name for feature in self._input_features
+                   if feature.name not in data.columns]
+        if missing:
+            raise ValueError(f"Missing input columns: {missing}")
+        if any(feature.name not in self._artifacts
+               for feature in self._input_features):
+            raise ValueError("Pipeline has not been fitted yet.")
+        return self._compact_vectors(build_feature_matrix(
+            self._input_features, self._artifacts, data,
+            sparse=self._model.supports_sparse,
+            dtype=np.dtype(self._dtype)))
+
+    def predict(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Predicts the target of raw input data.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The raw data, holding a column per input feature.
+
+        Returns
+        -------
+        np.ndarray
+            The predictions in the units or categories of the target.
+        """
+        predictions = self._model.predict(self.transform(data))
+        return inverse_transform_feature(
+            self._artifacts[self._target_feature.name], predictions)
+
     def _register_artifact(self, name: str, artifact: Dict[str, Any]) -> None:
         """
         Registers an artifact with the given name.
@@ -137,52 +266,153 @@ Pipeline(
         """
         self._artifacts[name] = artifact
 
+    def _read_dataset(self) -> pd.DataFrame:
+        """
+        Decodes the columns used by the pipeline, once per pipeline.
+
+        Returns
+        -------
+        pd.DataFrame
+            The input and target columns of the dataset.
+        """
+        if self._data is None:
+            columns = [feature.name for feature in self._input_features]
+            if self._target_feature.name not in columns:
+                columns.append(self._target_feature.name)
+            self._data = self._dataset.read(columns=columns)
+        return self._data
+
+    def _cache_key(self) -> Tuple:
+        """
+        Returns the key of the split and preprocessed data in the cache.
+        """
+        features = tuple(
+            (feature.name, feature.type)
+            for feature in self._input_features + [self._target_feature])
+        return ("pipeline", self._dataset.content_digest, self._split,
+                self._seed, features, self._dtype)
+
+    def _sparse_inputs(self) -> bool:
+        """
+        Returns whether the cached feature matrix is built as CSR, which
+        happens whenever one-hot encodings exist, whatever the model.
+        """
+        return any(feature.type == "categorical"
+                   for feature in self._input_features)
+
+    def _split_data(self) -> None:
+        """
+        Splits the rows of the dataset into training and testing sets.
+
+        The split is a row index, positional unless a seed is given, and
+        is computed once per pipeline.
+        """
+        if self._train_rows is not None:
+            return
+        cached = get_cache().get(self._cache_key())
+        if cached is not None:
+            self._train_rows = cached["train_rows"]
+            self._test_rows = cached["test_rows"]
+            return
+        n_rows = len(self._read_dataset())
+        n_train = int(self._split * n_rows)
+        rows = np.arange(n_rows)
+        if self._seed is not None:
+            rows = np.random.default_rng(self._seed).permutation(n_rows)
+        self._train_rows = rows[:n_train]
+        self._test_rows = rows[n_train:]
+
     def _preprocess_features(self) -> None:
         """
         Preprocesses the input and target features.
+
+        The transforms are fitted on the training rows only and applied
+        to all rows. The cached input matrix is CSR when one-hot
+        encodings exist and is densified here, once, for models that do
+        not support sparse input; the target is always dense.
         """
-        (target_feature_name, target_data, artifact) = preprocess_features(
-            [self._target_feature], self._dataset
-        )[0]
-        self._register_artifact(target_feature_name, artifact)
-        input_results = preprocess_features(
-            self._input_features, self._dataset)
-        for (feature_name, data, artifact) in input_results:
-            self._register_artifact(feature_name, artifact)
-        self._output_vector = target_data
-        self._input_vectors = [
-            data for (feature_name, data, artifact) in input_results
-        ]
+        key = self._cache_key()
+        cached = get_cache().get(key)
+        if cached is None:
+            self._split_data()
+            cached = get_cache().put(key, self._fit_transforms())
+        self._train_rows = cached["train_rows"]
+        self._test_rows = cached["test_rows"]
+        for name, artifact in cached["artifacts"].items():
+            self._register_artifact(name, artifact)
+        X = cached["X"]
+        if sp.issparse(X) and not self._model.supports_sparse:
+            X = X.toarray()
+        n_train, n_rows = len(self._train_rows), X.shape[0]
+        self._train_X = row_slice(X, 0, n_train)
+        self._test_X = row_slice(X, n_train, n_rows)
+        self._train_y = cached["y"][:n_train]
+        self._test_y = cached["y"][n_train:]
 
-    def _split_data(self) -> None:
+    def _fit_transforms(self) -> Dict[str, Any]:
         """
-        Splits the data into training and testing sets.
+        Fits the feature transforms on the training rows.
+
+        Only the classes of a categorical target are taken from all rows.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The row index, the fitted artifacts by feature name, and the
+            input matrix "X" and target matrix "y" over all rows,
+            training rows first, in the compute dtype.
         """
-        split = self._split
-        self._train_X = [vector[:int(split * len(vector))]
-                         for vector in self._input_vectors]
-        self._test_X = [vector[int(split * len(vector)):]
-                        for vector in self._input_vectors]
-        self._train_y = self._output_vector[
-            :int(split * len(self._output_vector))]
-        self._test_y = self._output_vector[
-            int(split * len(self._output_vector)):]
+        raw = self._read_dataset()
+        features = self._input_features + [self._target_feature]
+        artifacts = {
+            feature.name: fit_feature(
+                feature, raw[feature.name].to_numpy()[self._train_rows])
+            for feature in features
+        }
+        if self._target_feature.type == "categorical":
+            # The list of classes is not leakage: a class missing from
+            # the training rows must still be a class of the test rows.
+            artifacts[self._target_feature.name] = fit_feature(
+                self._target_feature,
+                raw[self._target_feature.name].to_numpy())
+        dtype = np.dtype(self._dtype)
+        rows = None
+        if self._seed is not None:
+            rows = np.concatenate([self._train_rows, self._test_rows])
+        return {
+            "train_rows": self._train_rows,
+            "test_rows": self._test_rows,
+            "artifacts": artifacts,
+            "X": build_feature_matrix(
+                self._input_features, artifacts, raw, rows,
+                sparse=self._sparse_inputs(), dtype=dtype),
+            "y": build_feature_matrix(
+                [self._target_feature], artifacts, raw, rows, dtype=dtype),
+        }
 
-    def _compact_vectors(self, vectors: List[np.array]) -> np.array:
+    def _compact_vectors(
+            self, matrix: Union[np.array, sp.csr_matrix]) -> np.array:
         """
-        Compacts a list of vectors into a single numpy array.
+        Adapts a feature matrix to the input the model accepts.
+
+        CSR matrices are only densified when the model does not support
+        sparse input, and the result is cast to the compute dtype,
+        without a copy when it already has it.
 
         Parameters
         ----------
-        vectors : List[np.array]
-            A list of numpy arrays to be compacted.
+        matrix : Union[np.array, sp.csr_matrix]
+            A feature matrix from the feature-matrix builder.
 
         Returns
         -------
         np.array
-            A single numpy array.
+            A single numpy array, or a CSR matrix for models that
+            support sparse input.
         """
-        return np.concatenate(vectors, axis=1)
+        if sp.issparse(matrix) and not self._model.supports_sparse:
+            matrix = matrix.toarray()
+        return matrix.astype(np.dtype(self._dtype), copy=False)
 
     def _train(self) -> None:
         """
@@ -198,12 +428,11 @@ Pipeline(
         """
         X = self._compact_vectors(self._test_X)
         Y = self._test_y
-        self._metrics_results = []
         predictions = self._model.predict(X)
-        for metric in self._metrics:
-            result = metric.evaluate(predictions, Y)
-            self._metrics_results.append(
-                (f"{metric.__class__.__name__}: {float(result)}"))
+        results = evaluate_metrics(self._metrics, predictions, Y)
+        self._metrics_results = [
+            f"{metric.__class__.__name__}: {float(result)}"
+            for metric, result in zip(self._metrics, results)]
         self._predictions = predictions
 
     def execute(self) -> Dict[str, Any]:
@@ -215,8 +444,8 @@ Pipeline(
         dict
             A dictionary containing the metrics results and predictions.
         """
-        self._preprocess_features()
         self._split_data()
+        self._preprocess_features()
         self._train()
         self._evaluate()
         return {
@@ -1,9 +1,26 @@
 from abc import ABC, abstractmethod
+import mmap
 import os
+import tempfile
 from typing import List
 from glob import glob
 
 
+def _read_umask() -> int:
+    """
+    Read the file mode creation mask of the process.
+
+    Returns:
+        int: The umask.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_FILE_MODE = 0o666 & ~_read_umask()
+
+
 class NotFoundError(Exception):
     """
     Exception raised when a path is not found.
@@ -47,6 +64,36 @@ class Storage(ABC):
         """
         pass
 
+    def load_view(self, path: str) -> memoryview:
+        """
+        Load data from a given path as a read-only buffer.
+
+        Backends that cannot map their data return a view over a copy.
+
+        Args:
+            path (str): Path to load data.
+
+        Returns:
+            memoryview: View over the loaded data.
+        """
+        return memoryview(self.load(path))
+
+    def append(self, data: bytes, path: str) -> None:
+        """
+        Append data to the end of a given path, creating it if needed.
+
+        Backends without a native append fall back to a load and save.
+
+        Args:
+            data (bytes): Data to append.
+            path (str): Path to append data to.
+        """
+        try:
+            existing = self.load(path)
+        except NotFoundError:
+            existing = b""
+        self.save(existing + data, path)
+
     @abstractmethod
     def delete(self, path: str) -> None:
         """
@@ -91,14 +138,33 @@ class LocalStorage(Storage):
         """
         Save data to a given key.
 
+        The data is written to a temporary file that then replaces the
+        key, so views mapped from the previous file keep reading it. The
+        file keeps the mode of the one it replaces, or gets the usual
+        mode of new files under the umask, not the private mode of
+        temporary files.
+
         Args:
             data (bytes): Data to save.
             key (str): Key to save data.
         """
         path = self._join_path(key)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb') as f:
-            f.write(data)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(data)
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = _FILE_MODE
+            os.chmod(temporary, mode)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
 
     def load(self, key: str) -> bytes:
         """
@@ -115,6 +181,40 @@ class LocalStorage(Storage):
         with open(path, 'rb') as f:
             return f.read()
 
+    def load_view(self, key: str) -> memoryview:
+        """
+        Memory-map the data at a given key without copying it.
+
+        Saving to the key later replaces the file instead of rewriting
+        it, so the view stays valid and keeps the data it was loaded with.
+
+        Args:
+            key (str): Key to load data.
+
+        Returns:
+            memoryview: Read-only view over the memory-mapped file.
+        """
+        path = self._join_path(key)
+        self._assert_path_exists(path)
+        if os.path.getsize(path) == 0:
+            return memoryview(b"")
+        with open(path, 'rb') as f:
+            return memoryview(
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def append(self, data: bytes, key: str) -> None:
+        """
+        Append data to the end of a given key, creating it if needed.
+
+        Args:
+            data (bytes): Data to append.
+            key (str): Key to append data to.
+        """
+        path = self._join_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            f.write(data)
+
     def delete(self, key: str = "/") -> None:
         """
         Delete data at a given key.
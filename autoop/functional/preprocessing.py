@@ -1,46 +1,326 @@
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from autoop.core.ml.feature import Feature
 from autoop.core.ml.dataset import Dataset
 import numpy as np
+import pandas as pd
+from scipy import sparse as sp
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 
 def preprocess_features(
-        features: List[Feature], dataset: Dataset) -> List[
-            Tuple[str, np.ndarray, dict]]:
+        features: List[Feature], dataset: Dataset,
+        data: Optional[pd.DataFrame] = None,
+        sparse: bool = False, dtype: np.dtype = np.float64) -> List[
+            Tuple[str, Union[np.ndarray, sp.csr_matrix], dict]]:
     """
     Preprocess features.
 
+    Only the columns of the given features are read from the dataset.
+    The artifacts hold the fitted state, the categories of encoders and
+    the mean and scale of scalers, which `build_feature_matrix` reapplies.
+
     Args:
         features (List[Feature]): List of features.
         dataset (Dataset): Dataset object.
+        data (Optional[pd.DataFrame]): Already decoded columns of the
+            dataset. The dataset is read when omitted.
+        sparse (bool): Whether to keep one-hot encodings as CSR matrices
+            instead of densifying them. Defaults to False.
+        dtype (np.dtype): The dtype of the preprocessed features, float32
+            or float64. The fitted state is always kept in float64.
 
     Returns:
-        List[Tuple[str, np.ndarray, dict]]: List of preprocessed features.
-        Each ndarray of shape (N, ...)
+        List[Tuple[str, Union[np.ndarray, sp.csr_matrix], dict]]: List of
+        preprocessed features. Each matrix of shape (N, ...)
     """
     results = []
-    raw = dataset.read()
+    raw = data
+    if raw is None:
+        raw = dataset.read(columns=[feature.name for feature in features])
     for feature in features:
-        if feature.type == "categorical":
-            encoder = OneHotEncoder()
-            data = encoder.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
-            ).toarray()
-            aritfact = {
-                "type": "OneHotEncoder",
-                "encoder": encoder.get_params()
-            }
-            results.append((feature.name, data, aritfact))
-        if feature.type == "numerical":
-            scaler = StandardScaler()
-            data = scaler.fit_transform(
-                raw[feature.name].values.reshape(-1, 1)
-            )
-            artifact = {
-                "type": "StandardScaler",
-                "scaler": scaler.get_params()
-            }
-            results.append((feature.name, data, artifact))
+        values = raw[feature.name].to_numpy()
+        artifact = fit_feature(feature, values)
+        results.append(
+            (feature.name,
+             transform_feature(artifact, values, sparse, dtype), artifact))
     results = list(sorted(results, key=lambda x: x[0]))
     return results
+
+
+def fit_feature(feature: Feature, values: np.ndarray) -> dict:
+    """
+    Fit the transform of a feature without transforming anything.
+
+    Categorical features get a one-hot encoder and numerical features a
+    standard scaler.
+
+    Args:
+        feature (Feature): The feature.
+        values (np.ndarray): The raw values to fit on.
+
+    Returns:
+        dict: The artifact holding the fitted state.
+    """
+    if feature.type == "categorical":
+        encoder = OneHotEncoder().fit(values.reshape(-1, 1))
+        return {
+            "type": "OneHotEncoder",
+            "encoder": encoder.get_params(),
+            "categories": encoder.categories_[0],
+        }
+    scaler = StandardScaler().fit(values.reshape(-1, 1))
+    return {
+        "type": "StandardScaler",
+        "scaler": scaler.get_params(),
+        "mean": scaler.mean_,
+        "scale": scaler.scale_,
+    }
+
+
+def _category_codes(artifact: dict, values: np.ndarray) -> np.ndarray:
+    """
+    Look up the one-hot column of every value, -1 for unseen categories.
+
+    Args:
+        artifact (dict): A fitted OneHotEncoder artifact.
+        values (np.ndarray): The raw values.
+
+    Returns:
+        np.ndarray: The column of every value within the encoding.
+    """
+    return pd.Index(artifact["categories"]).get_indexer(values)
+
+
+def _check_fitted(artifact: dict) -> None:
+    """
+    Check that an artifact holds fitted state.
+
+    Args:
+        artifact (dict): The artifact made by `preprocess_features`.
+
+    Raises:
+        ValueError: If the artifact holds no fitted state.
+    """
+    if "categories" not in artifact and "mean" not in artifact:
+        raise ValueError(
+            f"Artifact of type {artifact['type']} holds no fitted state."
+        )
+
+
+def feature_width(artifact: dict) -> int:
+    """
+    Get the number of columns a fitted feature transform produces.
+
+    Args:
+        artifact (dict): The artifact made by `preprocess_features`.
+
+    Returns:
+        int: The width of the transformed feature.
+    """
+    _check_fitted(artifact)
+    if artifact["type"] == "OneHotEncoder":
+        return len(artifact["categories"])
+    return 1
+
+
+def transform_feature(
+        artifact: dict, values: np.ndarray, sparse: bool = False,
+        dtype: np.dtype = np.float64) -> Union[np.ndarray, sp.csr_matrix]:
+    """
+    Apply the fitted state of a feature artifact to new values.
+
+    Categories unseen during fitting are encoded as all-zero rows.
+
+    Args:
+        artifact (dict): The artifact made by `preprocess_features`.
+        values (np.ndarray): The raw values of the feature.
+        sparse (bool): Whether to return one-hot encodings as CSR.
+        dtype (np.dtype): The dtype of the transformed values.
+
+    Returns:
+        Union[np.ndarray, sp.csr_matrix]: The transformed values, of shape
+        (N, ...).
+
+    Raises:
+        ValueError: If the artifact holds no fitted state.
+    """
+    _check_fitted(artifact)
+    if artifact["type"] == "OneHotEncoder":
+        codes = _category_codes(artifact, values)
+        rows = np.flatnonzero(codes >= 0)
+        data = sp.csr_matrix(
+            (np.ones(len(rows), dtype=dtype), (rows, codes[rows])),
+            shape=(len(codes), len(artifact["categories"])),
+        )
+        return data if sparse else data.toarray()
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 1)
+    return ((values - artifact["mean"]) / artifact["scale"]).astype(
+        dtype, copy=False)
+
+
+def inverse_transform_feature(artifact: dict,
+                              data: np.ndarray) -> np.ndarray:
+    """
+    Map transformed values back to the raw values of a feature.
+
+    One-hot rows become their most likely category and scaled values are
+    unscaled.
+
+    Args:
+        artifact (dict): The artifact made by `preprocess_features`.
+        data (np.ndarray): Transformed values of shape (N, ...).
+
+    Returns:
+        np.ndarray: The raw values, of shape (N,).
+
+    Raises:
+        ValueError: If the artifact holds no fitted state.
+    """
+    _check_fitted(artifact)
+    data = np.asarray(data)
+    if artifact["type"] == "OneHotEncoder":
+        return artifact["categories"][np.argmax(
+            data.reshape(len(data), -1), axis=1)]
+    return (data.reshape(-1) * artifact["scale"]) + artifact["mean"]
+
+
+def build_feature_matrix(
+        features: List[Feature], artifacts: Dict[str, dict],
+        data: pd.DataFrame, rows: Optional[np.ndarray] = None,
+        sparse: bool = False,
+        dtype: np.dtype = np.float64) -> Union[np.ndarray, sp.csr_matrix]:
+    """
+    Assemble transformed features into one preallocated matrix.
+
+    The width of every feature is known from its fitted state, so the
+    matrix is allocated once and every transform writes straight into its
+    own column slice, sorted by feature name like `preprocess_features`.
+
+    With `sparse` and at least one categorical feature the matrix is CSR
+    instead, holding exactly one stored entry per feature in every row:
+    the scaled value or the one-hot column. Its data and index arrays
+    are allocated once in the same way.
+
+    Args:
+        features (List[Feature]): List of features.
+        artifacts (Dict[str, dict]): The fitted artifacts by feature name.
+        data (pd.DataFrame): The raw data, holding a column per feature.
+        rows (Optional[np.ndarray]): Positions of the rows to transform,
+            in output order. All rows are transformed when omitted.
+        sparse (bool): Whether to build a CSR matrix when one-hot
+            encodings are present.
+        dtype (np.dtype): The dtype of the matrix, float32 or float64.
+
+    Returns:
+        Union[np.ndarray, sp.csr_matrix]: The feature matrix.
+    """
+    features = sorted(features, key=lambda feature: feature.name)
+    widths = [feature_width(artifacts[feature.name]) for feature in features]
+    offsets = np.concatenate([[0], np.cumsum(widths, dtype=np.int64)])
+    n_rows = len(data) if rows is None else len(rows)
+    sparse = sparse and any(
+        feature.type == "categorical" for feature in features)
+
+    if sparse:
+        n_features = len(features)
+        index_dtype = np.int32
+        if max(n_rows * n_features, offsets[-1]) >= np.iinfo(np.int32).max:
+            index_dtype = np.int64
+        values_out = np.zeros((n_rows, n_features), dtype=dtype)
+        indices = np.empty((n_rows, n_features), dtype=index_dtype)
+    else:
+        matrix = np.zeros((n_rows, offsets[-1]), dtype=dtype)
+
+    for position, feature in enumerate(features):
+        artifact = artifacts[feature.name]
+        values = data[feature.name].to_numpy()
+        if rows is not None:
+            values = values[rows]
+        offset = offsets[position]
+        if artifact["type"] == "OneHotEncoder":
+            codes = _category_codes(artifact, values)
+            known = codes >= 0
+            if sparse:
+                values_out[:, position] = known
+                indices[:, position] = offset + np.where(known, codes, 0)
+            else:
+                known_rows = np.flatnonzero(known)
+                matrix[known_rows, offset + codes[known_rows]] = 1
+            continue
+        column = (values_out[:, position] if sparse
+                  else matrix[:, offset])
+        np.subtract(np.asarray(values, dtype=np.float64),
+                    artifact["mean"][0], out=column, casting="same_kind")
+        np.divide(column, artifact["scale"][0], out=column,
+                  casting="same_kind")
+        if sparse:
+            indices[:, position] = offset
+
+    if not sparse:
+        return matrix
+    indptr = np.arange(0, n_rows * n_features + 1, n_features,
+                       dtype=index_dtype)
+    return sp.csr_matrix(
+        (values_out.ravel(), indices.ravel(), indptr),
+        shape=(n_rows, int(offsets[-1])),
+    )
+
+
+def feature_chunks(
+        input_features: List[Feature], target_feature: Feature,
+        artifacts: Dict[str, dict], chunks: Iterable[pd.DataFrame],
+        sparse: bool = False, dtype: np.dtype = np.float64) -> Iterator[
+            Tuple[Union[np.ndarray, sp.csr_matrix], np.ndarray]]:
+    """
+    Transform raw chunks of data into model inputs and targets.
+
+    The fitted artifacts are applied to one chunk at a time, so the
+    chunks of `Dataset.read_chunks` can feed out-of-core training
+    without materialising the dataset.
+
+    Args:
+        input_features (List[Feature]): The input features.
+        target_feature (Feature): The target feature.
+        artifacts (Dict[str, dict]): The fitted artifact of every feature.
+        chunks (Iterable[pd.DataFrame]): Raw chunks holding a column per
+            feature.
+        sparse (bool): Whether the inputs are built as CSR.
+        dtype (np.dtype): The dtype of the matrices.
+
+    Yields:
+        Tuple[Union[np.ndarray, sp.csr_matrix], np.ndarray]: The input
+        matrix and the target matrix of every chunk.
+    """
+    for chunk in chunks:
+        yield (
+            build_feature_matrix(input_features, artifacts, chunk,
+                                 sparse=sparse, dtype=dtype),
+            build_feature_matrix([target_feature], artifacts, chunk,
+                                 dtype=dtype),
+        )
+
+
+def row_slice(matrix: Union[np.ndarray, sp.csr_matrix], start: int,
+              stop: int) -> Union[np.ndarray, sp.csr_matrix]:
+    """
+    Take a contiguous range of rows without copying the data.
+
+    Args:
+        matrix (Union[np.ndarray, sp.csr_matrix]): A dense or CSR matrix.
+        start (int): The first row.
+        stop (int): The row after the last one.
+
+    Returns:
+        Union[np.ndarray, sp.csr_matrix]: A view of the rows; for CSR the
+        data and index arrays are shared with the original matrix.
+    """
+    if not sp.issparse(matrix):
+        return matrix[start:stop]
+    indptr = matrix.indptr[start:stop + 1]
+    # The constructor copies views of much larger arrays, so the arrays
+    # are assigned after construction instead.
+    view = sp.csr_matrix((stop - start, matrix.shape[1]), dtype=matrix.dtype)
+    view.data = matrix.data[indptr[0]:indptr[-1]]
+    view.indices = matrix.indices[indptr[0]:indptr[-1]]
+    view.indptr = indptr - indptr[0]
+    return view
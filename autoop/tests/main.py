@@ -3,6 +3,11 @@ from autoop.tests.test_database import TestDatabase
 from autoop.tests.test_storage import TestStorage
 from autoop.tests.test_features import TestFeatures
 from autoop.tests.test_pipeline import TestPipeline
+from autoop.tests.test_registry import TestRegistry
+from autoop.tests.test_dataset import TestDataset
+from autoop.tests.test_model import TestModel
+from autoop.tests.test_metric import TestMetric
+from autoop.tests.test_preprocessing import TestPreprocessing
 
 def main():
     """Run all unit tests."""
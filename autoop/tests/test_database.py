@@ -3,6 +3,7 @@ from autoop.core.database import Database
 from autoop.core.storage import LocalStorage
 import random
 import tempfile
+import os
 
 class TestDatabase(unittest.TestCase):
     """Test cases for the Database class."""
@@ -55,4 +56,64 @@ class TestDatabase(unittest.TestCase):
         key = str(random.randint(0, 100))
         value = {"key": random.randint(0, 100)}
         self.db.set("collection", key, value)
-        self.assertIn((key, value), self.db.list("collection"))
\ No newline at end of file
+        self.assertIn((key, value), self.db.list("collection"))
+
+    def test_journal_persistance(self):
+        """Test that journaled mutations are replayed on load."""
+        db = Database(self.storage, journal=True)
+        db.set("collection", "kept", {"key": 1})
+        db.set("collection", "removed", {"key": 2})
+        db.delete("collection", "removed")
+        other_db = Database(self.storage, journal=True)
+        self.assertEqual(other_db.get("collection", "kept")["key"], 1)
+        self.assertIsNone(other_db.get("collection", "removed"))
+
+    def test_journal_partial_record(self):
+        """Test that writes after a torn journal record survive reloads."""
+        db = Database(self.storage, journal=True)
+        db.set("collection", "kept", {"key": 1})
+        self.storage.append(b'{"op": "set", "coll',
+                            os.path.join("_meta", "journal"))
+        reopened = Database(self.storage, journal=True)
+        reopened.set("collection", "later", {"key": 2})
+        other_db = Database(self.storage, journal=True)
+        self.assertEqual(other_db.get("collection", "kept")["key"], 1)
+        self.assertEqual(other_db.get("collection", "later")["key"], 2)
+
+    def test_journal_compaction(self):
+        """Test that the journal is folded into snapshots."""
+        db = Database(self.storage, journal=True, compaction_threshold=3)
+        for id in range(3):
+            db.set("collection", str(id), {"key": id})
+        self.assertEqual(self.storage.load(os.path.join("_meta", "journal")),
+                         b"")
+        self.assertIn(os.path.join("collection", "2"), self.storage.list(""))
+        other_db = Database(self.storage)
+        self.assertEqual(len(other_db.list("collection")), 3)
+
+    def test_transaction(self):
+        """Test that a transaction flushes only once, at exit."""
+        with self.db.transaction():
+            self.db.set("collection", "a", {"key": 1})
+            self.db.set("collection", "b", {"key": 2})
+            self.assertIsNone(Database(self.storage).get("collection", "a"))
+        other_db = Database(self.storage)
+        self.assertEqual(other_db.get("collection", "b")["key"], 2)
+
+    def test_transaction_rollback(self):
+        """Test that a failing transaction discards its mutations."""
+        self.db.set("collection", "a", {"key": 1})
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.set("collection", "a", {"key": 2})
+                raise RuntimeError()
+        self.assertEqual(self.db.get("collection", "a")["key"], 1)
+
+    def test_refresh_if_changed(self):
+        """Test that a reload only happens after storage changed."""
+        other_db = Database(self.storage)
+        self.assertFalse(other_db.refresh_if_changed())
+        self.db.set("collection", "a", {"key": 1})
+        self.assertTrue(other_db.refresh_if_changed())
+        self.assertEqual(other_db.get("collection", "a")["key"], 1)
+        self.assertFalse(other_db.refresh_if_changed())
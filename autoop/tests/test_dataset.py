@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.cache import DataCache
+from autoop.core.ml.dataset import Dataset
+
+
+class TestDataset(unittest.TestCase):
+    """Unit tests for the Dataset class."""
+
+    def setUp(self) -> None:
+        """Set up a small dataframe."""
+        self.df = pd.DataFrame({
+            "a": [1.0, 2.0, 3.0],
+            "b": ["x", "y", "z"],
+            "c": [4, 5, 6],
+        })
+
+    def test_parquet_roundtrip(self):
+        """Test that datasets are stored as Parquet and read back."""
+        dataset = Dataset.from_dataframe(self.df, "df", "df.parquet")
+        self.assertEqual(dataset.metadata["encoding"], "parquet")
+        self.assertTrue(dataset.read().equals(self.df))
+
+    def test_parquet_keeps_types(self):
+        """Test that Parquet keeps the types CSV would lose."""
+        df = pd.DataFrame({"code": ["007", "010"], "flag": [True, False],
+                           "count": np.array([1, 2], dtype=np.int32)})
+        dataset = Dataset.from_dataframe(df, "df", "df.parquet")
+        self.assertEqual(bytes(dataset.data[:4]), b"PAR1")
+        read = dataset.read()
+        self.assertEqual(list(read["code"]), ["007", "010"])
+        self.assertEqual(read["flag"].dtype, bool)
+        self.assertEqual(read["count"].dtype, np.int32)
+
+    def test_mixed_object_column(self):
+        """Test that columns mixing Python types are stored as strings."""
+        df = pd.DataFrame({"a": [1, "x", None], "b": [1.0, 2.0, 3.0]})
+        read = Dataset.from_dataframe(df, "df", "df.parquet").read()
+        self.assertEqual(list(read["a"][:2]), ["1", "x"])
+        self.assertTrue(read["a"].isna()[2])
+        self.assertEqual(df["a"][0], 1)
+
+    def test_legacy_csv(self):
+        """Test that datasets without an encoding are read as CSV."""
+        dataset = Dataset(name="df", asset_path="df.csv",
+                          data=self.df.to_csv(index=False).encode())
+        self.assertTrue(dataset.read().equals(self.df))
+
+    def test_read_columns(self):
+        """Test reading a subset of the columns."""
+        dataset = Dataset.from_dataframe(self.df, "df", "df.parquet")
+        self.assertEqual(list(dataset.read(columns=["a", "c"]).columns),
+                         ["a", "c"])
+        legacy = Dataset(name="df", asset_path="df.csv",
+                         data=self.df.to_csv(index=False).encode())
+        self.assertEqual(list(legacy.read(columns=["b"]).columns), ["b"])
+
+    def test_read_chunks(self):
+        """Test that chunks cover the data in order."""
+        parquet = Dataset.from_dataframe(self.df, "df", "df.parquet")
+        legacy = Dataset(name="df", asset_path="df.csv",
+                         data=self.df.to_csv(index=False).encode())
+        for dataset in (parquet, legacy):
+            chunks = list(dataset.read_chunks(["a", "b"], chunk_size=7))
+            self.assertTrue(all(len(chunk) <= 7 for chunk in chunks))
+            pd.testing.assert_frame_equal(
+                pd.concat(chunks, ignore_index=True), self.df[["a", "b"]],
+                check_dtype=False)
+
+    def test_read_is_cached(self):
+        """Test that repeated reads share one decoded frame."""
+        dataset = Dataset.from_dataframe(self.df, "df", "df.parquet")
+        self.assertIs(dataset.read(), dataset.read())
+        self.assertEqual(list(dataset.read(columns=["b"]).columns), ["b"])
+
+    def test_cache_eviction(self):
+        """Test that the cache evicts least recently used entries."""
+        cache = DataCache(max_bytes=2 * 800)
+        cache.put("a", np.zeros(100))
+        cache.put("b", np.zeros(100))
+        cache.get("a")
+        cache.put("c", np.zeros(100))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.size, 2 * 800)
@@ -0,0 +1,101 @@
+import unittest
+import numpy as np
+
+from autoop.core.ml.metric import (
+    ConfusionMatrix, RegressionStatistics, evaluate_metrics, get_metric)
+
+
+class TestMetric(unittest.TestCase):
+    """Unit tests for the metrics."""
+
+    def setUp(self) -> None:
+        """Set up labels with a class that is never predicted."""
+        self.ground_truth = np.array(["a", "a", "b", "b", "c", "c"])
+        self.prediction = np.array(["a", "b", "b", "b", "a", "a"])
+
+    def test_confusion_matrix(self):
+        """Test the counts of the confusion matrix."""
+        matrix = ConfusionMatrix(self.prediction, self.ground_truth)
+        np.testing.assert_array_equal(matrix.classes, ["a", "b", "c"])
+        np.testing.assert_array_equal(
+            matrix.matrix, [[1, 1, 0], [0, 2, 0], [2, 0, 0]])
+
+    def test_confusion_matrix_large_labels(self):
+        """Test that large integer labels do not size the matrix."""
+        labels = np.array([90210, 10001, 90210])
+        matrix = ConfusionMatrix(labels, labels)
+        np.testing.assert_array_equal(matrix.classes, [10001, 90210])
+        self.assertEqual(matrix.matrix.shape, (2, 2))
+        self.assertEqual(get_metric("accuracy").evaluate(labels, labels), 1)
+
+    def test_classification_metrics(self):
+        """Test the macro-averaged classification metrics."""
+        expected = {
+            "accuracy": 0.5,
+            "precision": (1 / 3 + 2 / 3 + 0) / 3,
+            "recall": (1 / 2 + 1 + 0) / 3,
+            "f1": (0.4 + 0.8 + 0) / 3,
+        }
+        for name, value in expected.items():
+            result = get_metric(name).evaluate(
+                self.prediction, self.ground_truth)
+            self.assertIsInstance(result, float)
+            self.assertAlmostEqual(result, value)
+
+    def test_one_hot_and_shared(self):
+        """Test that one-hot rows are compared whole and shared."""
+        ground_truth = np.eye(3)[[0, 1, 2, 2]]
+        prediction = np.eye(3)[[0, 1, 1, 2]]
+        self.assertEqual(
+            get_metric("accuracy").evaluate(prediction, ground_truth), 0.75)
+        metrics = [get_metric(name) for name in
+                   ["accuracy", "precision", "recall", "f1"]]
+        self.assertEqual(
+            evaluate_metrics(metrics, prediction, ground_truth),
+            [metric.evaluate(prediction, ground_truth)
+             for metric in metrics])
+        prediction[:] = ground_truth
+        self.assertEqual(
+            evaluate_metrics(metrics[:1], prediction, ground_truth), [1.0])
+        self.assertEqual(
+            get_metric("accuracy").evaluate(prediction, ground_truth), 1.0)
+
+    def test_all_zero_rows(self):
+        """Test that all-zero one-hot rows never match class 0."""
+        ground_truth = np.eye(2)[[0, 0, 1]]
+        prediction = np.array([[1, 0], [0, 0], [0, 1]])
+        self.assertAlmostEqual(
+            get_metric("accuracy").evaluate(prediction, ground_truth), 2 / 3)
+
+    def test_regression_metrics(self):
+        """Test the regression metrics against direct formulas."""
+        rng = np.random.default_rng(0)
+        ground_truth = rng.normal(size=(1000, 1))
+        prediction = ground_truth.ravel() + rng.normal(size=1000) * 0.1
+        residual = ground_truth.ravel() - prediction
+        mse = np.mean(residual ** 2)
+        total = np.sum((ground_truth - ground_truth.mean()) ** 2)
+        expected = {
+            "mean_squared_error": mse,
+            "root_mean_squared_error": np.sqrt(mse),
+            "r_squared": 1 - np.sum(residual ** 2) / total,
+        }
+        for name, value in expected.items():
+            self.assertAlmostEqual(
+                get_metric(name).evaluate(prediction, ground_truth), value)
+
+    def test_regression_streaming(self):
+        """Test that chunked accumulation matches a single pass."""
+        rng = np.random.default_rng(1)
+        ground_truth = rng.normal(loc=5, size=999)
+        prediction = ground_truth + rng.normal(size=999)
+        statistics = RegressionStatistics()
+        for start in range(0, 999, 100):
+            statistics.update(prediction[start:start + 100],
+                              ground_truth[start:start + 100])
+        for name in ["mean_squared_error", "root_mean_squared_error",
+                     "r_squared"]:
+            metric = get_metric(name)
+            self.assertAlmostEqual(
+                metric.from_statistics(statistics),
+                metric.evaluate(prediction, ground_truth))
@@ -0,0 +1,318 @@
+import unittest
+import pickle
+from unittest import mock
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+from scipy import sparse as sp
+from threadpoolctl import threadpool_info
+
+from autoop.core.ml.model import get_model
+from autoop.core.ml.model.classification import KNN_model
+from autoop.core.ml.model.classification.KNN_model import (
+    KNearestNeighbors, _attach_worker, _worker_state)
+from autoop.core.ml.model.regression.lasso_model import Lasso
+from autoop.core.ml.model.regression.least_squares import SOLVERS
+from autoop.core.ml.model.regression.linear_regression_model import (
+    LinearRegression)
+from autoop.core.ml.model.regression.multiple_linear_regression_model import (
+    MultipleLinearRegression)
+from autoop.core.ml.parallel import CPUBudget, get_cpu_budget
+
+
+class TestModel(unittest.TestCase):
+    """Unit tests for the models."""
+
+    def setUp(self) -> None:
+        """Set up random classification data."""
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(2000, 4))
+        self.y = rng.integers(0, 3, 2000)
+        self.queries = rng.normal(size=(300, 4))
+        self._budget_total = get_cpu_budget().total
+        get_cpu_budget().total = 4
+
+    def tearDown(self) -> None:
+        """Restore the CPU budget."""
+        get_cpu_budget().total = self._budget_total
+
+    def _reference_knn(self, k):
+        """Predict with a naive per-row KNN."""
+        predictions = []
+        for query in self.queries:
+            distances = np.linalg.norm(self.X - query, axis=1)
+            labels = self.y[np.argsort(distances)[:k]]
+            counts = np.bincount(labels, minlength=3)
+            tied = np.flatnonzero(counts == counts.max())
+            predictions.append(next(x for x in labels if x in tied))
+        return np.array(predictions)
+
+    def test_knn_blocks(self):
+        """Test that block-wise scoring is independent of the block size."""
+        expected = self._reference_knn(5)
+        for batch_size in [1, 7, 300, None]:
+            model = KNearestNeighbors(k=5, algorithm="brute",
+                                      batch_size=batch_size)
+            model.fit(self.X, self.y)
+            np.testing.assert_array_equal(
+                model.predict(self.queries), expected)
+        # k larger than the training set votes over all of it.
+        model = KNearestNeighbors(k=50, algorithm="brute")
+        model.fit(self.X[:10], np.array([0] * 6 + [1] * 4))
+        np.testing.assert_array_equal(
+            model.predict(self.queries), np.zeros(300))
+
+    def test_knn_legacy_pickle(self):
+        """Test that KNN models pickled before encoding still predict."""
+        model = KNearestNeighbors(k=5)
+        model.fit(self.X, self.y)
+        legacy = object.__new__(KNearestNeighbors)
+        legacy.__dict__.update({
+            key: model.__dict__[key] for key in [
+                "name", "type", "k", "observations", "ground_truth",
+                "_parameters"] if key in model.__dict__})
+        restored = pickle.loads(pickle.dumps(legacy))
+        np.testing.assert_array_equal(
+            restored.predict(self.queries), self._reference_knn(5))
+
+    def test_knn_backends(self):
+        """Test that every KNN backend matches a naive implementation."""
+        expected = self._reference_knn(5)
+        for algorithm in ["brute", "kd_tree", "ball_tree"]:
+            model = KNearestNeighbors(k=5, algorithm=algorithm,
+                                      batch_size=64)
+            model.fit(self.X, self.y)
+            np.testing.assert_array_equal(
+                model.predict(self.queries), expected)
+
+    def test_knn_auto_algorithm(self):
+        """Test the backend picked by "auto" and that trees are pickled."""
+        rng = np.random.default_rng(2)
+        cases = [((500, 4), "brute"), ((2000, 4), "kd_tree"),
+                 ((2000, 20), "ball_tree"), ((2000, 50), "brute")]
+        for shape, algorithm in cases:
+            model = KNearestNeighbors(k=5)
+            model.fit(rng.normal(size=shape), rng.integers(0, 3, shape[0]))
+            self.assertEqual(model.parameters["algorithm"], algorithm)
+            self.assertEqual(model._tree is None, algorithm == "brute")
+        model = KNearestNeighbors(k=5, algorithm="kd_tree")
+        model.fit(self.X, self.y)
+        restored = pickle.loads(pickle.dumps(model))
+        self.assertIsNotNone(restored._tree)
+        np.testing.assert_array_equal(
+            restored.predict(self.queries), self._reference_knn(5))
+
+    def test_knn_parallel(self):
+        """Test that parallel scoring keeps the order of the rows."""
+        model = KNearestNeighbors(k=5, algorithm="brute", batch_size=50,
+                                  n_jobs=2)
+        model.fit(self.X, self.y)
+        with mock.patch.object(KNN_model, "_MIN_PROCESS_WORK", 0):
+            np.testing.assert_array_equal(
+                model.predict(self.queries), self._reference_knn(5))
+        model.close()
+
+    def test_knn_worker_reuse(self):
+        """Test that scoring processes live until refit, pickle or close."""
+        model = KNearestNeighbors(k=5, algorithm="brute", batch_size=50,
+                                  n_jobs=2)
+        model.fit(self.X, self.y)
+        model.predict(self.queries)
+        self.assertIsNone(model._workers)
+        with mock.patch.object(KNN_model, "_MIN_PROCESS_WORK", 0):
+            model.predict(self.queries)
+            workers = model._workers
+            np.testing.assert_array_equal(
+                model.predict(self.queries), self._reference_knn(5))
+            self.assertIs(model._workers, workers)
+            self.assertIsNone(pickle.loads(pickle.dumps(model))._workers)
+            model.fit(self.X, self.y)
+            self.assertIsNone(model._workers)
+            self.assertFalse(workers[2].alive)
+            model.predict(self.queries)
+        model.close()
+        self.assertIsNone(model._workers)
+
+    def test_knn_worker_threads(self):
+        """Test that scoring processes run single-threaded BLAS."""
+        memory = SharedMemory(create=True, size=self.X.nbytes)
+        try:
+            _attach_worker(memory.name, self.X.shape, self.X.dtype,
+                           np.zeros(len(self.X)), self.y, 3, 5)
+            for pool in threadpool_info():
+                self.assertEqual(pool["num_threads"], 1)
+        finally:
+            _worker_state.pop("limits").restore_original_limits()
+            _worker_state.pop("memory").close()
+            _worker_state.pop("model")
+            memory.unlink()
+
+    def test_cpu_budget(self):
+        """Test that reservations never exceed the budget but progress."""
+        budget = CPUBudget(3)
+        with budget.reserve(2) as first, budget.reserve(-1) as second:
+            self.assertEqual((first, second), (2, 1))
+            with budget.reserve(4) as third:
+                self.assertEqual(third, 1)
+        self.assertEqual(budget.available, 3)
+
+    def test_random_forest_parallel(self):
+        """Test that parallel forests match the serial forest."""
+        predictions = []
+        for settings in [{}, {"n_jobs": 2}, {"n_processes": 2}]:
+            model = get_model("random_forest", n_trees=10, **settings)
+            model._model.set_params(random_state=0)
+            model.fit(self.X, self.y)
+            predictions.append(model.predict(self.queries))
+        for prediction in predictions[1:]:
+            np.testing.assert_array_equal(prediction, predictions[0])
+
+    def test_flat_trees(self):
+        """Test that flat-array inference matches scikit-learn."""
+        for name in ["DecisionTree", "random_forest"]:
+            for ground_truth in [self.y, np.eye(3)[self.y]]:
+                model = get_model(name)
+                if name == "random_forest":
+                    model = get_model(name, n_trees=10)
+                model.fit(self.X, ground_truth)
+                expected = model._model.predict(self.queries)
+                np.testing.assert_array_equal(
+                    model.predict(self.queries), expected)
+                model.compile(drop_estimator=True)
+                self.assertIsNone(model._model)
+                np.testing.assert_array_equal(
+                    model.predict(self.queries), expected)
+
+        # Missing values follow the direction learnt at each node.
+        rng = np.random.default_rng(1)
+        observations, queries = self.X.copy(), self.queries.copy()
+        observations[rng.random(len(observations)) < 0.2, 0] = np.nan
+        queries[rng.random(len(queries)) < 0.2, 0] = np.nan
+        ground_truth = (np.nan_to_num(observations[:, 0], nan=-1.5) > 0)
+        for name in ["DecisionTree", "random_forest"]:
+            model = get_model(name)
+            model.fit(observations, ground_truth)
+            np.testing.assert_array_equal(
+                model.predict(queries), model._model.predict(queries))
+
+    def test_flat_trees_legacy_pickle(self):
+        """Test that trees pickled before flat inference still predict."""
+        for name in ["DecisionTree", "random_forest"]:
+            model = get_model(name)
+            model.fit(self.X, self.y)
+            legacy = object.__new__(type(model))
+            legacy.__dict__.update({
+                key: value for key, value in model.__dict__.items()
+                if key not in ["_flat", "n_jobs", "n_processes"]})
+            restored = pickle.loads(pickle.dumps(legacy))
+            self.assertIsNotNone(restored._flat)
+            np.testing.assert_array_equal(
+                restored.predict(self.queries), model.predict(self.queries))
+
+    def test_flat_trees_pickle(self):
+        """Test that compiled trees are pickled without the estimator."""
+        model = get_model("random_forest", n_trees=10)
+        model.fit(self.X, self.y)
+        restored = pickle.loads(pickle.dumps(model))
+        self.assertFalse(hasattr(restored._model, "estimators_"))
+        self.assertLess(len(pickle.dumps(restored)),
+                        len(pickle.dumps(model._model)))
+        np.testing.assert_array_equal(
+            restored.predict(self.queries), model.predict(self.queries))
+        restored.fit(self.X, self.y)
+        self.assertTrue(hasattr(restored._model, "estimators_"))
+
+    def test_sparse_input(self):
+        """Test that sparse-capable models accept CSR one-hot input."""
+        observations = np.hstack([self.X, np.eye(3)[self.y]])
+        queries = np.hstack([self.queries, np.eye(3)[self.y[:300]]])
+        ground_truth = self.X[:, 0] + self.y
+        for name in ["DecisionTree", "random_forest", "lasso"]:
+            target = self.y if name != "lasso" else ground_truth
+            dense = get_model(name)
+            model = get_model(name)
+            self.assertTrue(model.supports_sparse)
+            if name != "lasso":
+                dense._model.set_params(random_state=0)
+                model._model.set_params(random_state=0)
+            dense.fit(observations, target)
+            model.fit(sp.csr_matrix(observations), target)
+            np.testing.assert_allclose(
+                model.predict(sp.csr_matrix(queries)), dense.predict(queries))
+
+    def test_knn_one_hot(self):
+        """Test that one-hot labels are predicted as one-hot rows."""
+        model = KNearestNeighbors(k=5)
+        model.fit(self.X, np.eye(3)[self.y])
+        np.testing.assert_array_equal(
+            model.predict(self.queries), np.eye(3)[self._reference_knn(5)])
+
+    def test_linear_solvers(self):
+        """Test that every solver recovers the same regression."""
+        ground_truth = (self.X @ np.arange(1, 5) + 3).reshape(-1, 1)
+        for solver in SOLVERS:
+            model = MultipleLinearRegression(solver=solver)
+            model.fit(self.X, ground_truth)
+            np.testing.assert_allclose(
+                model.parameters["weights"].ravel(), np.arange(1, 5))
+            np.testing.assert_allclose(model.parameters["biases"], [3])
+
+    def test_linear_singular(self):
+        """Test that collinear one-hot columns still give a fit."""
+        observations = np.hstack([self.X, np.eye(3)[self.y]])
+        ground_truth = self.X @ np.arange(1, 5) + self.y
+        for solver in SOLVERS:
+            model = MultipleLinearRegression(solver=solver)
+            model.fit(observations, ground_truth)
+            np.testing.assert_allclose(
+                model.predict(observations), ground_truth, atol=1e-8)
+
+    def test_lasso_path(self):
+        """Test that the warm-started path matches independent fits."""
+        ground_truth = self.X @ np.array([2, 0, -1, 0]) + 1
+        model = Lasso()
+        results = model.fit_path(
+            self.X[:1500], ground_truth[:1500], alphas=[0.01, 1.0, 0.1],
+            validation=(self.X[1500:], ground_truth[1500:]))
+        np.testing.assert_array_equal(results["alphas"], [1.0, 0.1, 0.01])
+        for alpha, coef, intercept in zip(
+                results["alphas"], results["coefs"], results["intercepts"]):
+            reference = Lasso(alpha=alpha)
+            reference.fit(self.X[:1500], ground_truth[:1500])
+            np.testing.assert_allclose(
+                coef, reference._model.coef_, atol=1e-3)
+            np.testing.assert_allclose(
+                intercept, reference._model.intercept_, atol=1e-3)
+        self.assertEqual(results["best_index"], 2)
+        self.assertEqual(len(results["metrics"]["MeanSquaredError"]), 3)
+        self.assertEqual(model._model.alpha, 0.01)
+
+    def test_linear_streaming(self):
+        """Test that chunked training matches fitting all data at once."""
+        ground_truth = self.X @ np.arange(1, 5) + 3
+        full = LinearRegression()
+        full.fit(self.X, ground_truth)
+        chunks = [(self.X[start:start + 70], ground_truth[start:start + 70])
+                  for start in range(0, len(self.X), 70)]
+        streamed = LinearRegression()
+        streamed.fit_stream(chunks)
+        incremental = MultipleLinearRegression()
+        for observations, target in chunks:
+            incremental.partial_fit(observations, target.reshape(-1, 1))
+        np.testing.assert_allclose(streamed.weights, full.weights)
+        np.testing.assert_allclose(streamed.bias, full.bias)
+        np.testing.assert_allclose(
+            incremental.predict(self.queries).ravel(),
+            full.predict(self.queries))
+
+    def test_linear_float32(self):
+        """Test that float32 data keeps float32 predictions."""
+        ground_truth = self.X @ np.arange(1, 5) + 3
+        full = LinearRegression()
+        full.fit(self.X, ground_truth)
+        single = LinearRegression()
+        single.fit(self.X.astype(np.float32), ground_truth.astype(np.float32))
+        np.testing.assert_allclose(single.weights, full.weights, rtol=1e-4)
+        predictions = single.predict(self.queries.astype(np.float32))
+        self.assertEqual(predictions.dtype, np.float32)
+        np.testing.assert_allclose(
+            predictions, full.predict(self.queries), rtol=1e-4, atol=1e-4)
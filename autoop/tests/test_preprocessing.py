@@ -0,0 +1,219 @@
+import unittest
+import pickle
+import numpy as np
+import pandas as pd
+
+from autoop.core.ml.cache import get_cache
+from autoop.core.ml.dataset import Dataset
+from autoop.core.ml.feature import Feature
+from autoop.core.ml.metric import Accuracy
+from autoop.core.ml.model import get_model
+from autoop.core.ml.model.regression.multiple_linear_regression_model import (
+    MultipleLinearRegression)
+from autoop.core.ml.pipeline import Pipeline
+from autoop.functional.preprocessing import (
+    build_feature_matrix, feature_chunks, fit_feature, preprocess_features,
+    transform_feature)
+
+
+class TestPreprocessing(unittest.TestCase):
+    """Unit tests for fitted feature transforms."""
+
+    def setUp(self) -> None:
+        """Set up a small mixed dataset."""
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            "colour": rng.choice(["red", "green", "blue"], 200),
+            "size": rng.normal(10, 3, 200),
+        })
+        self.df["label"] = np.where(
+            self.df["size"] > 10, "big", "small")
+        self.dataset = Dataset.from_dataframe(self.df, "df", "df.parquet")
+        self.features = [Feature("colour", "categorical"),
+                         Feature("size", "numerical")]
+
+    def test_transform_matches_fit(self):
+        """Test that reapplying the fitted state reproduces the fit."""
+        fitted = preprocess_features(self.features, self.dataset)
+        artifacts = {name: artifact for name, _, artifact in fitted}
+        for name, expected, artifact in fitted:
+            result = transform_feature(artifact, self.df[name].to_numpy())
+            np.testing.assert_allclose(result, expected)
+
+    def test_unseen_category(self):
+        """Test that unseen categories become all-zero rows."""
+        fitted = preprocess_features(self.features[:1], self.dataset)
+        artifacts = {fitted[0][0]: fitted[0][2]}
+        new = pd.DataFrame({"colour": ["red", "purple"]})
+        result = build_feature_matrix(self.features[:1], artifacts, new)
+        np.testing.assert_array_equal(result.sum(axis=1), [1, 0])
+
+    def test_pipeline_predict_after_pickle(self):
+        """Test that a pickled pipeline serves raw data on its own."""
+        pipeline = Pipeline(
+            metrics=[Accuracy()], dataset=self.dataset,
+            model=get_model("DecisionTree"),
+            input_features=self.features,
+            target_feature=Feature("label", "categorical"), split=0.8)
+        pipeline.execute()
+        restored = pickle.loads(pickle.dumps(pipeline))
+        self.assertIsNone(restored._dataset)
+        predictions = restored.predict(self.df.drop(columns="label"))
+        np.testing.assert_array_equal(predictions, self.df["label"])
+
+    def test_exported_artifacts(self):
+        """Test that exported feature artifacts transform on their own."""
+        pipeline = Pipeline(
+            metrics=[Accuracy()], dataset=self.dataset,
+            model=get_model("DecisionTree"),
+            input_features=self.features,
+            target_feature=Feature("label", "categorical"), split=0.8)
+        pipeline.execute()
+        exported = {artifact.name: pickle.loads(artifact.data)
+                    for artifact in pipeline.artifacts}
+        self.assertEqual(set(exported), {
+            "colour", "size", "label", "pipeline_config",
+            "pipeline_model_classification"})
+        model = exported.pop("pipeline_model_classification")
+        del exported["pipeline_config"]
+        queries = pipeline._compact_vectors(pipeline._test_X)
+        np.testing.assert_array_equal(
+            model.predict(queries), pipeline.model.predict(queries))
+        for name, artifact in exported.items():
+            np.testing.assert_allclose(
+                transform_feature(artifact, self.df[name].to_numpy()),
+                transform_feature(pipeline._artifacts[name],
+                                  self.df[name].to_numpy()))
+
+    def test_target_classes_from_all_rows(self):
+        """Test that classes missing from the training rows are kept."""
+        df = self.df.sort_values("label", ignore_index=True)
+        n_big = int((df["label"] == "big").sum())
+        pipeline = Pipeline(
+            metrics=[Accuracy()],
+            dataset=Dataset.from_dataframe(df, "sorted", "sorted.parquet"),
+            model=get_model("KNN"), input_features=self.features,
+            target_feature=Feature("label", "categorical"),
+            split=n_big / len(df))
+        results = pipeline.execute()
+        np.testing.assert_array_equal(
+            pipeline._artifacts["label"]["categories"], ["big", "small"])
+        np.testing.assert_array_equal(pipeline._test_y.sum(axis=1), 1)
+        self.assertEqual(results["metrics"], ["Accuracy: 0.0"])
+
+    def test_dataset_decoded_once(self):
+        """Test that executing a pipeline decodes its dataset once."""
+        get_cache().clear()
+        decode = self.dataset._decode
+        calls = []
+        self.dataset._decode = lambda columns=None: (
+            calls.append(columns) or decode(columns))
+        pipeline = Pipeline(
+            metrics=[Accuracy()], dataset=self.dataset,
+            model=get_model("KNN"), input_features=self.features,
+            target_feature=Feature("label", "categorical"), split=0.8)
+        pipeline.execute()
+        self.assertIs(pipeline._read_dataset(), pipeline._read_dataset())
+        self.assertEqual(calls, [["colour", "size", "label"]])
+
+    def test_split_before_fit_is_cached(self):
+        """Test that transforms see only training rows and are reused."""
+        def make_pipeline(model_name):
+            return Pipeline(
+                metrics=[Accuracy()], dataset=self.dataset,
+                model=get_model(model_name),
+                input_features=self.features,
+                target_feature=Feature("label", "categorical"),
+                split=0.5, seed=3)
+        first = make_pipeline("DecisionTree")
+        first.execute()
+        train_rows = first._train_rows
+        self.assertEqual(len(train_rows), 100)
+        self.assertEqual(
+            sorted(np.concatenate([train_rows, first._test_rows])),
+            list(range(200)))
+        self.assertAlmostEqual(
+            float(first._artifacts["size"]["mean"][0]),
+            self.df["size"].iloc[train_rows].mean())
+
+        second = make_pipeline("random_forest")
+        second._read_dataset = None
+        second.execute()
+        self.assertTrue(
+            np.shares_memory(second._train_X.data, first._train_X.data))
+
+        dense = make_pipeline("KNN")
+        dense._read_dataset = None
+        dense.execute()
+        self.assertIsInstance(dense._train_X, np.ndarray)
+        np.testing.assert_array_equal(
+            dense._train_X, first._train_X.toarray())
+
+    def test_feature_matrix_views(self):
+        """Test that train and test sets are views of one matrix."""
+        for model_name in ["KNN", "DecisionTree"]:
+            pipeline = Pipeline(
+                metrics=[Accuracy()], dataset=self.dataset,
+                model=get_model(model_name),
+                input_features=self.features,
+                target_feature=Feature("label", "categorical"), split=0.8)
+            pipeline.execute()
+            train, test = pipeline._train_X, pipeline._test_X
+            self.assertEqual(train.shape, (160, 4))
+            self.assertEqual(test.shape, (40, 4))
+            if model_name == "KNN":
+                self.assertIs(train.base, test.base)
+            else:
+                self.assertIs(train.data.base, test.data.base)
+            fitted = preprocess_features(self.features, Dataset.from_dataframe(
+                self.df.iloc[:160], "train", "train.parquet"))
+            artifacts = {name: artifact for name, _, artifact in fitted}
+            expected = build_feature_matrix(
+                self.features, artifacts, self.df)
+            dense = test.toarray() if hasattr(test, "toarray") else test
+            np.testing.assert_allclose(dense, expected[160:])
+
+    def test_float32_pipeline(self):
+        """Test that float32 mode keeps float32 data end to end."""
+        results = {}
+        for dtype in ["float64", "float32"]:
+            pipeline = Pipeline(
+                metrics=[Accuracy()], dataset=self.dataset,
+                model=get_model("KNN"),
+                input_features=self.features,
+                target_feature=Feature("label", "categorical"),
+                split=0.8, dtype=dtype)
+            results[dtype] = pipeline.execute()
+            self.assertEqual(pipeline._train_X.dtype, np.dtype(dtype))
+            self.assertEqual(
+                pipeline.transform(self.df).dtype, np.dtype(dtype))
+        self.assertEqual(results["float32"]["metrics"],
+                         results["float64"]["metrics"])
+        with self.assertRaises(ValueError):
+            Pipeline(metrics=[Accuracy()], dataset=self.dataset,
+                     model=get_model("KNN"), input_features=self.features,
+                     target_feature=Feature("label", "categorical"),
+                     dtype="float16")
+
+    def test_streaming_fit_from_dataset_chunks(self):
+        """Test out-of-core training from the chunked dataset reader."""
+        df = self.df.assign(weight=2 * self.df["size"] + (
+            self.df["colour"] == "red") + np.linspace(0, 1, 200))
+        dataset = Dataset.from_dataframe(df, "df", "df.parquet")
+        target = Feature("weight", "numerical")
+        artifacts = {
+            feature.name: fit_feature(feature, df[feature.name].to_numpy())
+            for feature in self.features + [target]}
+        streamed = MultipleLinearRegression()
+        streamed.fit_stream(feature_chunks(
+            self.features, target, artifacts,
+            dataset.read_chunks(chunk_size=37)))
+        self.assertEqual(streamed._statistics.n_samples, 200)
+        observations = build_feature_matrix(self.features, artifacts, df)
+        full = MultipleLinearRegression()
+        full.fit(observations,
+                 build_feature_matrix([target], artifacts, df))
+        np.testing.assert_allclose(
+            streamed.predict(observations), full.predict(observations),
+            atol=1e-8)
+
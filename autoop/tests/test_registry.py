@@ -0,0 +1,88 @@
+import unittest
+import tempfile
+import os
+
+from app.core.system import ArtifactRegistry
+from autoop.core.database import Database
+from autoop.core.storage import LocalStorage
+from autoop.core.ml.artifact import Artifact
+
+
+class TestRegistry(unittest.TestCase):
+    """Test cases for the ArtifactRegistry class."""
+
+    def setUp(self):
+        """Set up a registry over temporary storage."""
+        temp_dir = tempfile.mkdtemp()
+        self.storage = LocalStorage(os.path.join(temp_dir, "objects"))
+        self.database_storage = LocalStorage(os.path.join(temp_dir, "dbo"))
+        self.database = Database(self.database_storage)
+        self.registry = ArtifactRegistry(self.database, self.storage)
+
+    def _artifact(self, name, type, **metadata):
+        """Build a small artifact."""
+        return Artifact(name=name, type=type, asset_path=f"{name}.bin",
+                        data=name.encode(), tags=["automl"],
+                        metadata=metadata)
+
+    def test_list_is_lazy(self):
+        """Test that listing does not read artifact data."""
+        self.registry.register(self._artifact("iris", "dataset"))
+        artifact = self.registry.list(type="dataset")[0]
+        self.assertIsNone(artifact._data)
+        self.assertEqual(artifact.data, b"iris")
+        entries = self.registry.list_metadata(type="dataset")
+        self.assertEqual(entries[0]["id"], "iris_1.0.0")
+
+    def test_list_metadata_skips_storage(self):
+        """Test that listings never read from storage."""
+        self.registry.register_many([
+            self._artifact("iris", "dataset"),
+            self._artifact("model", "pipeline", task_type="regression")])
+        reads = []
+        self.storage.load = lambda key: reads.append(key)
+        self.storage.load_view = lambda key: reads.append(key)
+        entries = self.registry.list_metadata()
+        self.assertEqual([entry["id"] for entry in entries],
+                         ["iris_1.0.0", "model_1.0.0"])
+        self.assertEqual(entries[1]["metadata"], {"task_type": "regression"})
+        self.assertEqual(len(self.registry.list()), 2)
+        self.assertEqual(reads, [])
+
+    def test_find(self):
+        """Test compound queries over the indexes."""
+        self.registry.register_many([
+            self._artifact("a", "pipeline", task_type="classification",
+                           target_feature="quality"),
+            self._artifact("b", "pipeline", task_type="regression",
+                           target_feature="quality"),
+            self._artifact("c", "dataset"),
+        ])
+        ids = self.registry.find(type="pipeline", task_type="classification",
+                                 target_feature="quality")
+        self.assertEqual(ids, ["a_1.0.0"])
+        self.assertEqual(len(self.registry.find(tags=["automl"])), 3)
+        self.registry.delete("a_1.0.0")
+        self.assertEqual(self.registry.find(task_type="classification"), [])
+
+    def test_index_follows_reload(self):
+        """Test that the indexes see changes made by another registry."""
+        self.registry.register(self._artifact("a", "dataset"))
+        other = ArtifactRegistry(Database(self.database._storage),
+                                 self.storage)
+        other.register(self._artifact("b", "dataset"))
+        self.database.refresh_if_changed()
+        self.assertEqual(len(self.registry.list(type="dataset")), 2)
+
+    def test_legacy_digest_is_persisted(self):
+        """Test that a digest computed for a legacy dataset is saved."""
+        self.registry.register(self._artifact("iris", "dataset"))
+        dataset = self.registry.get("iris_1.0.0")
+        self.assertNotIn("digest", dataset.metadata)
+        digest = dataset.content_digest
+        reloaded = Database(self.database_storage)
+        entry = reloaded.get("artifacts", "iris_1.0.0")
+        self.assertEqual(entry["metadata"]["digest"], digest)
+        fresh = ArtifactRegistry(reloaded, self.storage).get("iris_1.0.0")
+        fresh._on_digest = self.fail
+        self.assertEqual(fresh.content_digest, digest)
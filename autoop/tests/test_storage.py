@@ -30,6 +30,38 @@ class TestStorage(unittest.TestCase):
         except Exception as e:
             self.assertIsInstance(e, NotFoundError)
 
+    def test_load_view(self):
+        """Test loading data as a memory-mapped view."""
+        test_bytes = bytes([random.randint(0, 255) for _ in range(100)])
+        key = f"test{os.sep}path"
+        self.storage.save(test_bytes, key)
+        view = self.storage.load_view(key)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(bytes(view), test_bytes)
+
+    def test_overwrite_while_mapped(self):
+        """Test that saving over a mapped key keeps the old view valid."""
+        test_bytes = bytes([random.randint(0, 255) for _ in range(10000)])
+        key = f"test{os.sep}path"
+        self.storage.save(test_bytes, key)
+        view = self.storage.load_view(key)
+        self.storage.save(b"small", key)
+        self.assertEqual(bytes(view), test_bytes)
+        self.assertEqual(bytes(self.storage.load_view(key)), b"small")
+        self.assertEqual(self.storage.list("test"), [key])
+
+    def test_file_mode(self):
+        """Test that saved files get the umask mode, not a private one."""
+        umask = os.umask(0)
+        os.umask(umask)
+        key = f"test{os.sep}path"
+        self.storage.save(b"data", key)
+        path = os.path.join(self.storage._base_path, key)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+        os.chmod(path, 0o640)
+        self.storage.save(b"other", key)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
     def test_delete(self):
         """Test deleting data from LocalStorage."""
         key = str(random.randint(0, 100))